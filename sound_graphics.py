@@ -1,8 +1,13 @@
 # Zelle's graphics.py with added sounds
 # Peter Brown <phbrown@acm.org>, 2017-01-07
 
+import time
+_IMPORT_START = time.perf_counter()
+
 import graphics as g
 import math
+import mmap
+from collections import OrderedDict, deque
 import os
 import numbers
 import numpy as np
@@ -10,10 +15,190 @@ import pygame
 import pygame.mixer
 import pygame.sndarray
 import string
+import struct
 import subprocess
 import sys
+import threading
+import json
+import traceback
+import warnings
+import wave
+import sound_speech
 from tkinter import Event
-from typing import Optional, List, Tuple, Union
+from typing import Callable, Deque, Dict, Optional, List, TextIO, Tuple, Union
+
+# Directory of the sounds shipped with this module
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
+
+class AudioEngine(object):
+    """Process-wide owner of pygame's mixer.  Importing this module starts
+    nothing; only the mixer (not the rest of pygame) is initialized, the
+    first time a window opens or a sound is made.
+
+    Windows share the mixer: each acquire()s the channels it needs and
+    release()s them when it closes.  Channels are numbered from 0 and
+    reused, lowest first; the mixer gets more channels only when none are
+    free, and every channel ever handed out stays reserved, so Sound.play()
+    never picks one.  The mixer is shut down when the last user releases."""
+
+    _lock = threading.Lock()
+    _users = 0
+    _inUse:set = set() # Channel numbers handed out
+    _free:List[int] = [] # Channel numbers handed back, sorted
+    _format:Optional[Tuple[int, int, int]] = None # When it was last opened
+
+    @staticmethod
+    def init() -> None:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+            format = pygame.mixer.get_init()
+            if AudioEngine._format not in (None, format):
+                # Sounds made for the old format would play wrongly
+                soundRegistry.clear()
+                StaticNoise._sound = None
+            AudioEngine._format = format
+
+    @staticmethod
+    def format() -> Tuple[int, int, int]:
+        """Returns the mixer's actual format, as pygame.mixer.get_init()
+        reports it: (rate in Hz, bits per sample, negative if signed (and
+        32 bits are floating point), channels).  pygame picks it when the mixer
+        opens, unless pygame.mixer.pre_init was called first.  Sounds are
+        made in this format, so the mixer never has to convert them."""
+        AudioEngine.init()
+        return pygame.mixer.get_init()
+
+    @staticmethod
+    def toInt16(samples:np.ndarray) -> np.ndarray:
+        """Converts PCM SAMPLES of any integer or floating-point type to
+        int16 values.  int16 samples are returned as they are."""
+        if samples.dtype == np.int16:
+            return samples
+        elif samples.dtype.kind == 'f':
+            return np.clip(np.round(samples * 32768), -32768, 32767).astype(np.int16)
+        bits = 8 * samples.dtype.itemsize
+        wide = samples.astype(np.int64)
+        if samples.dtype.kind == 'u': # Unsigned samples are offset by half their range
+            wide -= 1 << (bits - 1)
+        if bits > 16:
+            wide >>= bits - 16
+        else:
+            wide <<= 16 - bits
+        return wide.astype(np.int16)
+
+    @staticmethod
+    def toNative(samples:np.ndarray) -> np.ndarray:
+        """Converts PCM SAMPLES, (frames, channels) or (frames,) of any
+        type, at the mixer's rate, to the mixer's sample type and number
+        of channels, shaped for pygame.sndarray.make_sound.  Samples that
+        are already int16 in a 16-bit mixer's layout aren't copied."""
+        _, size, channels = AudioEngine.format()
+        samples = AudioEngine.toChannels(
+            AudioEngine.toInt16(samples.reshape(len(samples), -1)), channels)
+        if size == 16:
+            samples = (samples.astype(np.int32) + 32768).astype(np.uint16)
+        elif size == 8:
+            samples = ((samples >> 8) + 128).astype(np.uint8)
+        elif size == -8:
+            samples = (samples >> 8).astype(np.int8)
+        elif abs(size) == 32: # pygame's 32-bit samples are floating point
+            samples = samples.astype(np.float32) / 32768
+        return samples[:, 0] if channels == 1 else samples
+
+    @staticmethod
+    def toChannels(samples:np.ndarray, channels:int) -> np.ndarray:
+        """Spreads SAMPLES (frames, channels) over CHANNELS channels.  Mono
+        goes to every channel, or every channel is averaged into mono;
+        otherwise the first two channels are left and right, and any others
+        are left silent."""
+        have = samples.shape[1]
+        if have == channels:
+            return samples
+        elif channels == 1:
+            return np.round(samples.mean(axis=1, keepdims=True)).astype(samples.dtype)
+        elif have == 1:
+            return np.repeat(samples, channels, axis=1)
+        wider = np.zeros((len(samples), channels), dtype=samples.dtype)
+        wider[:, :min(have, channels)] = samples[:, :channels]
+        return wider
+
+    @staticmethod
+    def quit() -> None:
+        """Shuts the mixer down now, whoever is still using it."""
+        with AudioEngine._lock:
+            AudioEngine._users = 0
+            AudioEngine._reset()
+
+    @staticmethod
+    def _reset() -> None:
+        AudioEngine._inUse.clear()
+        AudioEngine._free.clear()
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
+
+    @staticmethod
+    def acquire(count:int = 0) -> List[int]:
+        """Registers a user of the mixer, initializing it if need be, and
+        returns the numbers of COUNT channels for its exclusive use."""
+        with AudioEngine._lock:
+            AudioEngine.init()
+            AudioEngine._users += 1
+            numbers = AudioEngine._free[:count]
+            del AudioEngine._free[:count]
+            size = len(AudioEngine._inUse) + len(AudioEngine._free) + len(numbers)
+            numbers += range(size, size + count - len(numbers))
+            AudioEngine._inUse.update(numbers)
+            if numbers and numbers[-1] >= size:
+                # Grow the pool; doubling keeps this rare with many windows
+                reserved = numbers[-1] + 1
+                if reserved > pygame.mixer.get_num_channels():
+                    pygame.mixer.set_num_channels(
+                        max(reserved, 2 * pygame.mixer.get_num_channels()))
+                pygame.mixer.set_reserved(reserved)
+            return numbers
+
+    @staticmethod
+    def release(numbers:List[int]) -> None:
+        """Silences the channels NUMBERS from acquire() and returns them to
+        the pool, and unregisters their user.  The last user to release
+        shuts the mixer down."""
+        with AudioEngine._lock:
+            if AudioEngine._users == 0:
+                return # quit() got there first
+            for number in numbers:
+                if number in AudioEngine._inUse:
+                    channel = pygame.mixer.Channel(number)
+                    channel.stop()
+                    channel.set_volume(1.0)
+                    AudioEngine._inUse.discard(number)
+                    AudioEngine._free.append(number)
+            AudioEngine._free.sort()
+            AudioEngine._users -= 1
+            if AudioEngine._users == 0:
+                AudioEngine._reset()
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Users of the mixer, and its channels in use, free for reuse, and
+        in all."""
+        with AudioEngine._lock:
+            return {'users': AudioEngine._users, 'inUse': len(AudioEngine._inUse),
+                    'free': len(AudioEngine._free),
+                    'channels': pygame.mixer.get_num_channels()
+                                if pygame.mixer.get_init() else 0}
+
+    @staticmethod
+    def makeSound(samples:np.ndarray) -> pygame.mixer.Sound:
+        """pygame.sndarray.make_sound of SAMPLES at the mixer's rate,
+        converted to its format (see toNative), initializing the mixer if
+        need be."""
+        return pygame.sndarray.make_sound(AudioEngine.toNative(samples))
+
+    @staticmethod
+    def loadSound(filename:str) -> pygame.mixer.Sound:
+        """pygame.mixer.Sound(FILENAME), initializing the mixer if need be."""
+        AudioEngine.init()
+        return pygame.mixer.Sound(filename)
 
 class GraphWin(g.GraphWin):
     """Graphics window with additional sound.  The sound follows the
@@ -22,29 +207,127 @@ class GraphWin(g.GraphWin):
     Conference on Auditory Display, ICAD 2010_, pp. 89-95, Washington, DC, 
     USA, June 9-15, 2010."""
 
+    _tkSettled = False
+
+    # None uses the Tk canvas's own index: find_overlapping only hits the
+    # outline of an unfilled shape, and graphics.py draws shapes unfilled,
+    # so it misses a pointer inside one.
+    HIT_BACKENDS = ('grid', 'raster', 'linear')
+
     def __init__(self, title:str = "Graphics Window", width:int = 200,
-                 height:int = 200, autoflush:bool = True) -> None:
+                 height:int = 200, autoflush:bool = True,
+                 mouseToneStep:float = 10,
+                 maxMotionRate:Optional[float] = 100,
+                 threaded:bool = False, mouseVoice:str = 'tone',
+                 instrument:bool = False,
+                 statsInterval:Optional[float] = None,
+                 hitBackend:str = 'grid', itemVoices:int = 1,
+                 trace:Optional[str] = None) -> None:
+        """MOUSETONESTEP is the pitch resolution of the mouse tone, in
+        cents (hundredths of a semitone).  MAXMOTIONRATE is the most
+        pointer updates per second that are sonified; motion events in
+        between are coalesced.  None sonifies every motion event.  If
+        THREADED is true, hit-testing and all mixer calls happen on a
+        background SonificationWorker instead of the Tk event thread.
+        MOUSEVOICE is 'tone' to loop a short Tone for each pitch, or
+        'stream' to play a continuously gliding StreamingOscillator.
+        If INSTRUMENT is true, pointer updates are timed (see stats()),
+        and if STATSINTERVAL is given, a summary is printed to stderr that
+        often, in seconds.  HITBACKEND picks how the pointer is hit-tested:
+        'grid' (a SpatialGrid), 'raster' (a HitRaster, best for scenes
+        that rarely change) or 'linear' (every item, for reference).
+        ITEMVOICES is how many item sounds play at once: with 1, the item
+        the pointer is INSIDE, or else the one it is NEAR, plays on a
+        channel of its own; with more, the nearest that many items it is
+        INSIDE or NEAR are mixed by a VoiceMixer, louder the nearer they
+        are.  If TRACE is given, the pointer's movements and the scene are
+        recorded to that file by a TraceRecorder, for
+        soundgraphicsreplay.py."""
+        if hitBackend not in GraphWin.HIT_BACKENDS:
+            raise ValueError('hitBackend must be one of %s, not %r'
+                             % (', '.join(GraphWin.HIT_BACKENDS), hitBackend))
+        if mouseVoice not in ('tone', 'stream'):
+            raise ValueError("mouseVoice must be 'tone' or 'stream', not %r" % mouseVoice)
+        if itemVoices < 1:
+            raise ValueError('itemVoices must be at least 1, not %r' % itemVoices)
+        # Opened before the window and its channels, so a bad path leaks neither
+        traceFile = open(trace, 'w', encoding='utf-8') if trace else None
+        # MacOS fix 1: let Tk settle once, before the first window
+        if not GraphWin._tkSettled:
+            update()
+            GraphWin._tkSettled = True
         super().__init__(title, width, height, autoflush)
+        # The sonification options, as recorded in traces
+        self._options = {'mouseToneStep': mouseToneStep, 'maxMotionRate': maxMotionRate,
+                         'threaded': threaded, 'mouseVoice': mouseVoice,
+                         'hitBackend': hitBackend, 'itemVoices': itemVoices}
         #pygame.mixer.pre_init(frequency=44100)
-        pygame.init()
+        # Background, item and mouse channels, shared with no other window
+        self._channels = AudioEngine.acquire(3)
+        self.hitBackend = hitBackend
+        self._sceneVersion = 0 # Bumped whenever sound geometry may change
+        self._batchTester:Optional[Tuple[int, BatchHitTester]] = None
+        if hitBackend == 'grid':
+            self._hitIndex:HitBackend = SpatialGrid()
+        elif hitBackend == 'raster':
+            self._hitIndex = HitRaster(self)
+        else:
+            self._hitIndex = LinearHits(self)
+        self._raster = self._hitIndex if isinstance(self._hitIndex, HitRaster) else None
+        # Guards the hit-testing structures when a worker thread reads them
+        self._sceneLock = threading.RLock()
+        self._worker:Optional[SonificationWorker] = None
+        if threaded:
+            self._worker = SonificationWorker(self)
+            self._motion = MotionDispatcher(self, self._worker.postPointer,
+                                            maxMotionRate)
+        else:
+            self._motion = MotionDispatcher(self, self._updatePointer,
+                                            maxMotionRate)
+        # Last hit-test result and pan applied by _updatePointer
+        self._lastHit:Optional[Tuple] = None
         self.bind("<Motion>", self._onMouseMove)
         self.bind("<Enter>", self._onEnter)
         self.bind("<Leave>", self._onLeave)
 
-        # Generate static programmatically
-        noise = np.random.normal(0, 0.05, Tone.SAMPLE_RATE * 3)
-        noise = Tone.MAX_SAMPLE * noise
-        stereo = np.resize(noise, (len(noise), 2))
-        self.bgsound = pygame.sndarray.make_sound(np.asarray(stereo, dtype=np.int16))
-        self.bgchannel = pygame.mixer.Channel(0)
+        # The static isn't loaded until the pointer first enters
+        self.bgchannel = pygame.mixer.Channel(self._channels[0])
+        self._bgPlaying = False
         
-        self.itemchannel = pygame.mixer.Channel(1)
+        self.itemchannel = pygame.mixer.Channel(self._channels[1])
         self.itemsound = None # Item sound currently playing.
-        self.mousechannel = pygame.mixer.Channel(2)
-        pygame.mixer.set_reserved(3)
-        self.bgchannel.play(self.bgsound, loops=-1)
-        self.bgchannel.set_volume(0)
+        self._itemStream:Optional[SoundStream] = None # If itemsound is streamed
+        self.mousechannel = pygame.mixer.Channel(self._channels[2])
+        # Plays on itemchannel instead of itemsound, if ITEMVOICES > 1
+        self._voiceMixer:Optional[VoiceMixer] = None
+        if itemVoices > 1:
+            self._voiceMixer = VoiceMixer(itemVoices)
+        self.toneBank = ToneBank(mouseToneStep)
+        self._mouseKey:Optional[int] = None # Pitch-grid step now playing
+        self._mouseVolume = (1.0, 1.0) # left, right, as last set by runEngine
+        self._oscillator:Optional[StreamingOscillator] = None
+        if mouseVoice == 'stream':
+            self._oscillator = StreamingOscillator()
+        self._streaming = False # Whether _pumpAudio should feed the mixer
+        self._tickTimer:Optional[str] = None
+        self._latency:Optional[LatencyStats] = None
+        self._tested = 0 # Objects hit-tested by the last _hitTest
+        self._statsTimer:Optional[str] = None
+        if instrument or statsInterval:
+            self._latency = LatencyStats()
+        if statsInterval:
+            self._logStats(statsInterval)
+        self._recorder:Optional[TraceRecorder] = None
+        if trace:
+            self._recorder = TraceRecorder(self, trace, traceFile)
+        if self._worker is not None:
+            self._worker.start()
+
 
+    @property
+    def bgsound(self) -> pygame.mixer.Sound:
+        """The background static."""
+        return StaticNoise.getSound()
 
     def getPropPt(self, x:float, y:float, screen:bool = False) -> Tuple[float, float]:
         if screen == False:
@@ -56,14 +339,26 @@ class GraphWin(g.GraphWin):
 
     def runEngine(self, Xprop:float, sound:pygame.mixer.Sound, loops:int, 
                     mouseVol:float, bgVol:float, itemVol:float):
-        self.mousechannel.set_volume(mouseVol * (1 - Xprop), mouseVol * Xprop)
+        self._mouseVolume = (mouseVol * (1 - Xprop), mouseVol * Xprop)
+        if self._oscillator is not None:
+            self._oscillator.setVolume(*self._mouseVolume)
+        else:
+            self.mousechannel.set_volume(*self._mouseVolume)
         self.bgchannel.set_volume(bgVol * (1 - Xprop), bgVol * Xprop)
+        if self._voiceMixer is not None:
+            return # Item sounds are mixed by _updatePointer
         if self.itemsound == None or self.itemsound != sound:
             self.itemchannel.stop()
             self.itemsound = sound
+            self._itemStream = None
             if issubclass(type(sound), pygame.mixer.Sound): # sound is a pygame.mixer.Sound
                 self.itemchannel.play(sound, loops)
                 self.itemchannel.set_volume(itemVol * (1 - Xprop), itemVol * Xprop)
+            elif isinstance(sound, StreamedSound):
+                self._itemStream = sound.play(self.itemchannel, loops)
+                self._itemStream.volume = (itemVol * (1 - Xprop), itemVol * Xprop)
+                self.itemchannel.set_volume(*self._itemStream.volume)
+                self._startStreaming()
 
     def _playSoundInside(self, Xprop:float, sound:pygame.mixer.Sound, 
             loops:int) -> None:
@@ -77,46 +372,960 @@ class GraphWin(g.GraphWin):
         self.runEngine(Xprop, None, 0, 0.1, 0.5, 0)
 
     def _onEnter(self, e:Event) -> None:
-        self.bgchannel.play(self.bgsound, loops=-1)
+        if self._recorder is not None:
+            self._recorder.record('e', e)
+        if self._worker is not None:
+            self._worker.post('_startSound')
+        else:
+            self._startSound()
 
     def _onLeave(self, e:Event) -> None:
+        if self._recorder is not None:
+            self._recorder.record('l', e)
+        self._motion.reset()
+        if self._worker is not None:
+            self._worker.post('_stopSound')
+        else:
+            self._stopSound()
+
+    def _startSound(self) -> None:
+        self.bgchannel.play(self.bgsound, loops=-1)
+        self._bgPlaying = True
+
+    def _stopSound(self) -> None:
+        self._streaming = False
+        self._bgPlaying = False
         self.bgchannel.stop()
         self.itemchannel.stop()
         self.mousechannel.stop()
+        self._itemStream = None
+        if self._voiceMixer is not None:
+            self._voiceMixer.clear()
+        self._mouseKey = None
+        self._lastHit = None
+
+    # Interval between feeding blocks to the streaming voices, in ms
+    TICK_MS = 10
+
+    def _startStreaming(self) -> None:
+        """Starts feeding the streaming voices.  On the worker thread, the
+        worker does this between messages; otherwise an after() timer on
+        the Tk thread does it."""
+        if self._streaming:
+            return
+        self._streaming = True
+        if self._worker is None:
+            self._tick()
+
+    def _tick(self) -> None:
+        self._tickTimer = None
+        if not self._streaming or self.isClosed():
+            return
+        self._pumpAudio()
+        self._tickTimer = self.after(GraphWin.TICK_MS, self._tick)
+
+    def _pumpAudio(self) -> None:
+        """Tops up the channels of the streaming voices."""
+        if not self._streaming:
+            return
+        if self._oscillator is not None:
+            self._oscillator.pump(self.mousechannel)
+        if self._voiceMixer is not None and len(self._voiceMixer):
+            self._voiceMixer.pump(self.itemchannel)
+        if self._itemStream is not None:
+            self._itemStream.pump(self.itemchannel)
+            if self._itemStream.finished() and not self.itemchannel.get_busy():
+                self._itemStream = None
+
+    def addItem(self, item:g.GraphicsObject) -> None:
+        with self._sceneLock:
+            super().addItem(item)
+            if isinstance(item, SoundObject) and item.hasSound():
+                self._prepare([item])
+                self._hitIndex.insert(item)
+                self._sceneVersion += 1
+
+    def delItem(self, item:g.GraphicsObject) -> None:
+        with self._sceneLock:
+            super().delItem(item)
+            if isinstance(item, SoundObject):
+                self._hitIndex.remove(item)
+                self._sceneVersion += 1
+
+    def setCoords(self, x1:float, y1:float, x2:float, y2:float) -> None:
+        with self._sceneLock:
+            super().setCoords(x1, y1, x2, y2)
+            # Every screen-space bounding box depends on the transform
+            self._reindex()
+
+    def _itemMoved(self, item:'SoundObject') -> None:
+        """Called by a SoundObject drawn in this window after it moves or
+        changes shape."""
+        with self._sceneLock:
+            self._prepare([item])
+            self._hitIndex.update(item)
+            self._sceneVersion += 1
+
+    def _reindex(self) -> None:
+        with self._sceneLock:
+            items = self.soundItems()
+            self._prepare(items)
+            self._hitIndex.rebuild(items)
+            self._sceneVersion += 1
+
+    def _prepare(self, items:List['SoundObject']) -> None:
+        """If the window is threaded, computes the screenGeometry of ITEMS
+        now, on the Tk thread, so the worker finds it cached.  Measuring
+        Text and Images asks Tk, which only the Tk thread may do."""
+        if self._worker is not None:
+            for item in items:
+                if item.GEOMETRY is not None:
+                    item.screenGeometry()
+
+    def speechTexts(self) -> List[str]:
+        """Returns the texts spoken by the items drawn in this window, to
+        pre-render with SoundObject.speechCache.prerender."""
+        return [item.speechText() for item in self.items # type: ignore
+                if isinstance(item, SoundObject) and item.speechText()]
+
+    def soundItems(self) -> List['SoundObject']:
+        """Returns the drawn items that make sound, from back to front."""
+        return [item for item in self.items
+                if isinstance(item, SoundObject) and item.hasSound()]
+
+    def classifyPoints(self, xs:Union[np.ndarray, List[float]],
+                       ys:Union[np.ndarray, List[float]]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Classifies a batch of screen points against every sound item at
+        once.  See BatchHitTester.classify."""
+        return self.batchHitTester().classify(xs, ys)
+
+    def batchHitTester(self) -> 'BatchHitTester':
+        """Returns a BatchHitTester for the current scene, rebuilding it
+        only if the scene has changed since it was last built."""
+        if self._batchTester is None \
+                or self._batchTester[0] != self._sceneVersion:
+            self._batchTester = (self._sceneVersion,
+                                 BatchHitTester(self.soundItems()))
+        return self._batchTester[1]
+
+    def _hitTest(self, x:int, y:int) \
+            -> Tuple[Optional['SoundObject'], Optional['SoundObject']]:
+        """Returns the topmost sound item that screen point (x, y) is INSIDE
+        and the topmost one it is NEAR (either may be None).  If the point
+        is INSIDE some item, the NEAR item is irrelevant and is not sought."""
+        insideItem, nearItem, self._tested = self._hitIndex.hitTest(x, y)
+        return insideItem, nearItem
+
+    def _voiceHits(self, x:float, y:float) -> List[Tuple['SoundObject', int, float]]:
+        """Returns the (item, code, distance) of the sound items that
+        screen point (x, y) is INSIDE or NEAR, as many as the VoiceMixer
+        has voices, nearest first (see _allHits)."""
+        assert self._voiceMixer is not None
+        hits, self._tested = _allHits(self._hitIndex.candidates(x, y), x, y,
+                                      self._voiceMixer.voices)
+        return hits
 
     def _onMouseMove(self, e:Event) -> None:
-        #print(e.x, e.y, self.toWorld(e.x, e.y), end=': ')
+        if self._recorder is not None:
+            self._recorder.record('m', e)
+        self._motion.post(e.x, e.y) # type: ignore
+
+    def motionStats(self) -> Dict[str, int]:
+        """Counts of motion events received, sonified, coalesced into a
+        later event, and skipped as redundant."""
+        return self._motion.stats()
+
+    def stats(self) -> Dict[str, object]:
+        """Motion counts (see motionStats), pointer updates dropped by a
+        worker that fell behind, and, if the window is instrumented, the
+        LatencyStats of its pointer updates (else None), the HitRaster's
+        size in bytes and update counts (else None), and the shared
+        AudioEngine's channel counts."""
+        return {'hitBackend': self.hitBackend, 'motion': self.motionStats(),
+                'audio': AudioEngine.stats(),
+                'dropped': self._worker.dropped if self._worker is not None else 0,
+                'latency': self._latency.stats() if self._latency is not None else None,
+                'raster': self._raster.stats() if self._raster is not None else None}
+
+    def _logStats(self, interval:float) -> None:
+        self._statsTimer = None
+        if self.isClosed():
+            return
+        if self._latency is not None and self._motion.dispatched:
+            print('%s: %s' % (self.master.title(), self._latency.format()),
+                  file=sys.stderr)
+        self._statsTimer = self.after(int(interval * 1000), self._logStats, interval)
+
+    def _updatePointer(self, x:int, y:int) -> None:
+        """Sonifies the pointer at screen point (x, y)."""
+        #print(x, y, self.toWorld(x, y), end=': ')
         
-        Xprop, Yprop = self.getPropPt(e.x, e.y, True) # type: ignore
-        # Iterate over self.items from back to front, checking if the mouse
-        # is over any of the items with sound
-        insideItem = None
-        nearItem = None
-        for item in reversed(self.items):
-            if hasattr(item, 'hasSound') and item.hasSound(): # type: ignore
-                #x, y = self.toWorld(e.x, e.y)
-                assert isinstance(item, SoundObject)
-                contains = item.containsPt(e.x, e.y) # type: ignore
-                #print(contains, end=' ')
-                if contains == SoundObject.INSIDE:
-                    insideItem = item
-                    break
-                elif (contains == SoundObject.NEAR
-                      and nearItem == None):
-                    nearItem = item
-        #print()
-        mousesound = Tone(Tone.mouseTone(1 - Yprop)).getSound() #Tone(1 - Yprop).getSound()
-        self.mousechannel.play(mousesound, loops = -1)
-        if insideItem is not None:
-            self._playSoundInside(Xprop, insideItem.sound(), insideItem.loops())
-        elif nearItem is not None:
-            self._playSoundNear(Xprop, nearItem.sound(), nearItem.loops())
+        if not self._bgPlaying: # The pointer was already inside at startup
+            self._startSound()
+        latency = self._latency
+        if latency is not None:
+            start = time.perf_counter()
+        Xprop, Yprop = self.getPropPt(x, y, True)
+        with self._sceneLock:
+            if self._voiceMixer is not None:
+                hits = self._voiceHits(x, y)
+                insideItem = nearItem = None
+                if hits:
+                    # Mouse and static volumes follow the nearest item
+                    if hits[0][1] == SoundObject.INSIDE:
+                        insideItem = hits[0][0]
+                    else:
+                        nearItem = hits[0][0]
+            else:
+                insideItem, nearItem = self._hitTest(x, y)
+        if latency is not None:
+            hitTested = time.perf_counter()
+        freq = Tone.mouseTone(1 - Yprop)
+        if self._oscillator is not None:
+            # Glide there, without restarting anything
+            if not self._streaming:
+                self._oscillator.setFrequency(freq)
+                self._startStreaming()
+            self._oscillator.setTarget(freq)
+        else:
+            # Only restart the mouse voice when the quantized pitch changes
+            key = self.toneBank.quantize(freq)
+            if key != self._mouseKey:
+                self._mouseKey = key
+                self.mousechannel.play(self.toneBank.getSound(key), loops = -1)
+                # Playing clears the channel's panning
+                self.mousechannel.set_volume(*self._mouseVolume)
+        if latency is not None:
+            toned = time.perf_counter()
+        # Nothing else to update if neither the hit nor the pan has changed
+        hit = (insideItem, nearItem, Xprop)
+        if hit == self._lastHit:
+            self._motion.skipped += 1
         else:
-            self._playSoundOutside(Xprop)
+            self._lastHit = hit
+            if insideItem is not None:
+                self._playSoundInside(Xprop, insideItem.sound(), insideItem.loops())
+            elif nearItem is not None:
+                self._playSoundNear(Xprop, nearItem.sound(), nearItem.loops())
+            else:
+                self._playSoundOutside(Xprop)
+        if self._voiceMixer is not None:
+            # Distances change with every move, so the gains do too
+            self._voiceMixer.setHits(hits, Xprop)
+            if len(self._voiceMixer):
+                self._startStreaming()
+        if latency is not None:
+            end = time.perf_counter()
+            latency.record({'hitTest': hitTested - start, 'tone': toned - hitTested,
+                            'channels': end - toned, 'total': end - start},
+                           self._tested, end)
             
     def close(self) -> None:
+        self._motion.reset()
+        if self._worker is not None:
+            self._worker.stop()
+        self._streaming = False
+        if self._tickTimer is not None and not self.isClosed():
+            self.after_cancel(self._tickTimer)
+            self._tickTimer = None
+        if self._statsTimer is not None and not self.isClosed():
+            self.after_cancel(self._statsTimer)
+            self._statsTimer = None
+        if self._recorder is not None:
+            self._recorder.close()
         super().close()
-        pygame.quit()
+        if self._channels:
+            AudioEngine.release(self._channels)
+            self._channels = []
+
+class MotionDispatcher(object):
+    """Coalesces pointer motion for a GraphWin.  Only the latest pointer
+    position is kept, and it is handed to HANDLER at most RATE times per
+    second, using the window's after() timer; None or 0 for RATE hands
+    on every position immediately.  A position identical to the last one
+    handled is dropped."""
+
+    def __init__(self, win:g.GraphWin, handler:Callable[[int, int], None],
+                 rate:Optional[float] = 100) -> None:
+        self.win = win
+        self.handler = handler
+        self.interval = 1.0 / rate if rate else 0.0 # seconds
+        self._pending:Optional[Tuple[int, int]] = None
+        self._last:Optional[Tuple[int, int]] = None
+        self._lastTime = -math.inf
+        self._timer:Optional[str] = None # Tk after() id
+        # Counters
+        self.received = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.skipped = 0
+
+    def post(self, x:int, y:int) -> None:
+        """Records that the pointer is now at (x, y)."""
+        self.received += 1
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = (x, y)
+        if self._timer is not None:
+            return # Already waiting to dispatch
+        wait = self._lastTime + self.interval - time.perf_counter()
+        if wait <= 0:
+            self.flush()
+        else:
+            self._timer = self.win.after(int(math.ceil(wait * 1000)),
+                                         self._onTimer)
+
+    def _onTimer(self) -> None:
+        self._timer = None
+        if not self.win.isClosed():
+            self.flush()
+
+    def flush(self) -> None:
+        """Hands the pending position, if any, to the handler now."""
+        pending = self._pending
+        self._pending = None
+        if pending is None:
+            return
+        if pending == self._last:
+            self.skipped += 1
+            return
+        self._last = pending
+        self._lastTime = time.perf_counter()
+        self.dispatched += 1
+        self.handler(*pending)
+
+    def reset(self) -> None:
+        """Forgets any pending and last-handled position."""
+        if self._timer is not None:
+            if not self.win.isClosed():
+                self.win.after_cancel(self._timer)
+            self._timer = None
+        self._pending = None
+        self._last = None
+
+    def stats(self) -> Dict[str, int]:
+        return {'received': self.received, 'dispatched': self.dispatched,
+                'coalesced': self.coalesced, 'skipped': self.skipped}
+
+class LatencyHistogram(object):
+    """Rolling histogram of durations over the last WINDOW seconds, kept
+    as SLOTS sub-histograms that are recycled as time passes.  Buckets
+    are logarithmic, STEPS to an octave, from 1 microsecond up, so adding
+    a sample is a frexp and an increment."""
+
+    STEPS = 4 # Buckets per octave
+    OCTAVES = 32 # 1 us to over an hour
+
+    def __init__(self, window:float = 10.0, slots:int = 10) -> None:
+        self.slotSeconds = window / slots
+        nbuckets = LatencyHistogram.OCTAVES * LatencyHistogram.STEPS
+        self._counts = [[0] * nbuckets for _ in range(slots)]
+        self._sums = [0.0] * slots
+        self._maxes = [0.0] * slots
+        self._slot = 0 # Number of the current time slot
+
+    def _advance(self, now:float) -> int:
+        """Clears the slots that have expired by NOW; returns the index
+        of the current one."""
+        slot = int(now / self.slotSeconds)
+        n = len(self._sums)
+        if slot != self._slot:
+            for old in range(max(self._slot + 1, slot - n + 1), slot + 1):
+                i = old % n
+                counts = self._counts[i]
+                for b in range(len(counts)):
+                    counts[b] = 0
+                self._sums[i] = 0.0
+                self._maxes[i] = 0.0
+            self._slot = slot
+        return slot % n
+
+    def add(self, seconds:float, now:float) -> None:
+        i = self._advance(now)
+        us = seconds * 1e6
+        m, e = math.frexp(us)
+        b = min(max(e * LatencyHistogram.STEPS
+                    + int((m - 0.5) * 2 * LatencyHistogram.STEPS), 0),
+                len(self._counts[i]) - 1)
+        self._counts[i][b] += 1
+        self._sums[i] += us
+        if us > self._maxes[i]:
+            self._maxes[i] = us
+
+    @staticmethod
+    def bucketLimit(b:int) -> float:
+        """The upper edge of bucket B, in microseconds."""
+        e, step = divmod(b, LatencyHistogram.STEPS)
+        return 2.0 ** e * (0.5 + (step + 1) / (2 * LatencyHistogram.STEPS))
+
+    def summary(self, now:float) -> Dict[str, float]:
+        """Count, mean, percentiles (the upper edges of their buckets)
+        and maximum over the window, in microseconds."""
+        self._advance(now)
+        counts = [sum(column) for column in zip(*self._counts)]
+        total = sum(counts)
+        result = {'count': total, 'mean': sum(self._sums) / total if total else 0.0,
+                  'max': max(self._maxes)}
+        for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            rank = q * total
+            seen = 0
+            result[name] = 0.0
+            for b, count in enumerate(counts):
+                seen += count
+                if count and seen >= rank:
+                    result[name] = LatencyHistogram.bucketLimit(b)
+                    break
+        return result
+
+class LatencyStats(object):
+    """Opt-in timing of GraphWin pointer updates, per phase: 'hitTest',
+    'tone' (finding or synthesizing the mouse voice and starting it),
+    'channels' (the item and background channel updates) and 'total'.
+    Also counts the objects hit-tested per update.  Everything is over a
+    rolling WINDOW seconds."""
+
+    PHASES = ('hitTest', 'tone', 'channels', 'total')
+
+    def __init__(self, window:float = 10.0) -> None:
+        self.window = window
+        self.phases = {phase: LatencyHistogram(window) for phase in LatencyStats.PHASES}
+        self.tested = LatencyHistogram(window) # Counts, stored as "microseconds"
+        self.started = time.perf_counter()
+        self._lock = threading.Lock() # Updates may come from a worker thread
+
+    def record(self, timings:Dict[str, float], tested:int, now:float) -> None:
+        """Records one pointer update: TIMINGS maps phases to seconds."""
+        with self._lock:
+            for phase, seconds in timings.items():
+                self.phases[phase].add(seconds, now)
+            self.tested.add(tested * 1e-6, now)
+
+    def stats(self) -> Dict[str, object]:
+        """Per-phase summaries (microseconds), the rate of pointer updates
+        per second, and the objects tested per update."""
+        now = time.perf_counter()
+        with self._lock:
+            result:Dict[str, object] = {phase: h.summary(now)
+                                        for phase, h in self.phases.items()}
+            tested = self.tested.summary(now)
+        span = min(self.window, now - self.started)
+        result['rate'] = tested['count'] / span if span > 0 else 0.0
+        result['objectsTested'] = {'mean': tested['mean'], 'max': tested['max']}
+        return result
+
+    def format(self) -> str:
+        """A one-line summary, for logging."""
+        stats = self.stats()
+        parts = ['%.1f updates/s' % stats['rate']]
+        for phase in LatencyStats.PHASES:
+            s = stats[phase]
+            parts.append('%s p50 %.0f p99 %.0f max %.0f us'
+                         % (phase, s['p50'], s['p99'], s['max'])) # type: ignore
+        parts.append('%.1f objects tested' % stats['objectsTested']['mean']) # type: ignore
+        return '; '.join(parts)
+
+class TraceRecorder(object):
+    """Records what the pointer does in a GraphWin to the file FILENAME,
+    for soundgraphicsreplay.py to play back against later versions of
+    this module.  The file is JSON Lines: first a header describing the
+    window and its options, then a scene snapshot (see snapshot), and
+    then one [seconds, kind, x, y] array per event, where kind is 'm'
+    for motion, 'e' for entering and 'l' for leaving.  Whenever the sound
+    items or the window's coordinates have changed since the last
+    snapshot, a fresh one is written before the next event, as {"t":
+    seconds, "coords": setCoords arguments or null, "scene": [...]}."""
+
+    VERSION = 1
+
+    def __init__(self, win:GraphWin, filename:str, file:Optional[TextIO] = None) -> None:
+        """FILE, if given, is FILENAME already opened for writing."""
+        self.win = win
+        self.filename = filename
+        self.events = 0
+        self._file = file if file is not None else open(filename, 'w', encoding='utf-8')
+        self._start = time.perf_counter()
+        self._sceneVersion:Optional[int] = None
+        header = {'version': TraceRecorder.VERSION, 'title': win.master.title(),
+                  'width': win.getWidth(), 'height': win.getHeight(),
+                  'options': win._options, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self._write(header)
+
+    def _coords(self) -> Optional[List[float]]:
+        """The window's setCoords arguments, or None if it has none."""
+        trans = self.win.trans
+        if not trans:
+            return None
+        w, h = self.win.getWidth(), self.win.getHeight()
+        return [trans.xbase, trans.ybase - trans.yscale * (h - 1),
+                trans.xbase + trans.xscale * (w - 1), trans.ybase]
+
+    def _write(self, record:object) -> None:
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def record(self, kind:str, e:Optional[Event]) -> None:
+        """Records an event of KIND ('m', 'e' or 'l') at E's position."""
+        if self._file.closed:
+            return
+        t = round(time.perf_counter() - self._start, 6)
+        if self._sceneVersion != self.win._sceneVersion:
+            self._sceneVersion = self.win._sceneVersion
+            self._write({'t': t, 'coords': self._coords(),
+                         'scene': TraceRecorder.snapshot(self.win)})
+        self._write([t, kind, getattr(e, 'x', None), getattr(e, 'y', None)])
+        self.events += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    @staticmethod
+    def snapshot(win:GraphWin) -> List[Dict[str, object]]:
+        """Describes the sound items drawn in WIN, from back to front, in
+        world coordinates: each has the class that draws it ('kind'), the
+        arguments that make its shape, and its 'sound', as given to its
+        constructor (a number or a text to speak) or, for a Sound given
+        directly, {"seconds": its length}.  Images are described as the
+        Rectangle that they are hit-tested as."""
+        result = []
+        for item in win.soundItems():
+            kind = type(item).__name__
+            if isinstance(item, Point):
+                args:List[object] = [item.getX(), item.getY()]
+            elif isinstance(item, Circle):
+                center = item.getCenter()
+                args = [center.getX(), center.getY(), item.getRadius()]
+            elif isinstance(item, (Line, Rectangle, Oval)):
+                p1, p2 = item.getP1(), item.getP2()
+                args = [p1.getX(), p1.getY(), p2.getX(), p2.getY()]
+            elif isinstance(item, Polygon):
+                args = [v for p in item.getPoints() for v in (p.getX(), p.getY())]
+            elif isinstance(item, Text):
+                anchor = item.getAnchor()
+                args = [anchor.getX(), anchor.getY(), item.getText()] \
+                    + list(item.config['font'])
+            elif isinstance(item, Image):
+                anchor = item.getAnchor()
+                kind = 'Rectangle'
+                args = [anchor.getX() - item.getWidth() / 2,
+                        anchor.getY() - item.getHeight() / 2,
+                        anchor.getX() + item.getWidth() / 2,
+                        anchor.getY() + item.getHeight() / 2]
+            else:
+                continue
+            sound = item._soundArg
+            if sound is None:
+                sound = {'seconds': item.sound().get_length()} # type: ignore
+            result.append({'kind': kind, 'args': args, 'sound': sound})
+        return result
+
+    @staticmethod
+    def restore(win:GraphWin, scene:List[Dict[str, object]]) -> List['SoundObject']:
+        """Draws the items described by a snapshot SCENE in WIN, and
+        returns them.  Spoken texts without a rendered clip are replaced
+        by a second of silence, so the scene keeps its shape."""
+        items:List[SoundObject] = []
+        for entry in scene:
+            kind, args, sound = entry['kind'], entry['args'], entry['sound']
+            if isinstance(sound, dict):
+                sound = Tone.silence(sound['seconds'])
+            elif isinstance(sound, str):
+                try:
+                    sound = SoundObject.textToSpeech(sound)
+                except FileNotFoundError:
+                    sound = -1.0
+            P = g.Point
+            if kind == 'Point':
+                item:SoundObject = Point(args[0], args[1], sound=sound) # type: ignore
+            elif kind == 'Circle':
+                item = Circle(P(args[0], args[1]), args[2], sound=sound) # type: ignore
+            elif kind in ('Line', 'Rectangle', 'Oval'):
+                cls = {'Line': Line, 'Rectangle': Rectangle, 'Oval': Oval}[kind]
+                item = cls(P(args[0], args[1]), P(args[2], args[3]), sound=sound) # type: ignore
+            elif kind == 'Polygon':
+                item = Polygon(*[P(args[i], args[i + 1]) # type: ignore
+                                 for i in range(0, len(args), 2)], sound=sound) # type: ignore
+            elif kind == 'Text':
+                item = Text(P(args[0], args[1]), args[2], sound=sound) # type: ignore
+                item.setFace(args[3]) # type: ignore
+                item.setSize(args[4]) # type: ignore
+                item.setStyle(args[5]) # type: ignore
+            else:
+                raise ValueError('unknown kind of item %r' % kind)
+            item.draw(win)
+            items.append(item)
+        return items
+
+class SonificationWorker(threading.Thread):
+    """Background thread that owns all of a GraphWin's mixer interaction,
+    so the Tk event thread only enqueues work.  Messages are the names of
+    GraphWin methods to call, with their arguments.  Between messages, and
+    at least every TICK seconds, it feeds the window's streaming voices.
+    Posting never blocks: at most one pointer update waits in the queue,
+    so if the worker falls behind, a new position replaces the one it
+    hasn't got to yet, and only the window's other messages (entering and
+    leaving) can pile up."""
+
+    def __init__(self, win:'GraphWin') -> None:
+        super().__init__(name='sonification', daemon=True)
+        self.win = win
+        self._messages:Deque[Optional[Tuple]] = deque()
+        self._ready = threading.Condition()
+        self._pointer:Optional[Tuple] = None # The pointer update queued, if any
+        self.dropped = 0 # Pointer updates superseded while still queued
+
+    TICK = GraphWin.TICK_MS / 1000
+
+    def post(self, method:str, *args) -> None:
+        """Asks the worker to call win.METHOD(*ARGS)."""
+        with self._ready:
+            self._messages.append((method,) + args)
+            self._ready.notify_all()
+
+    def postPointer(self, x:int, y:int) -> None:
+        """Asks the worker to sonify the pointer at (x, y), instead of any
+        earlier position still queued."""
+        with self._ready:
+            self._dropPointer()
+            self._pointer = ('_updatePointer', x, y)
+            self._messages.append(self._pointer)
+            self._ready.notify_all()
+
+    def drain(self, timeout:float = 1.0) -> None:
+        """Waits up to TIMEOUT seconds for the worker to take every message
+        queued so far; the last may still be running."""
+        with self._ready:
+            self._ready.wait_for(lambda: not self._messages, timeout)
+
+    def _dropPointer(self) -> None:
+        if self._pointer is not None:
+            self._messages.remove(self._pointer)
+            self._pointer = None
+            self.dropped += 1
+
+    def stop(self, timeout:float = 1.0) -> None:
+        """Stops the worker after the work already queued, but for a stale
+        pointer update, and waits up to TIMEOUT seconds for it to finish."""
+        if self.is_alive():
+            with self._ready:
+                self._dropPointer()
+                self._messages.append(None)
+                self._ready.notify_all()
+            self.join(timeout)
+
+    def run(self) -> None:
+        while True:
+            with self._ready:
+                if not self._messages:
+                    self._ready.wait(SonificationWorker.TICK)
+                msg = self._messages.popleft() if self._messages else ()
+                if msg is self._pointer:
+                    self._pointer = None
+                if not self._messages:
+                    self._ready.notify_all() # For drain()
+            if msg is None:
+                break
+            if msg:
+                self._call(msg)
+            self._call(('_pumpAudio',))
+
+    def _call(self, msg:Tuple) -> None:
+        try:
+            getattr(self.win, msg[0])(*msg[1:])
+        except Exception:
+            # Keep the worker alive; a lost update is better than silence
+            traceback.print_exc()
+
+def _soundSamples(sound:Union[pygame.mixer.Sound, 'StreamedSound']) -> np.ndarray:
+    """The samples of SOUND, as a (frames, channels) array of int16
+    values."""
+    if isinstance(sound, StreamedSound):
+        samples = sound.samples
+    else:
+        samples = pygame.sndarray.samples(sound)
+    return AudioEngine.toInt16(samples.reshape(len(samples), -1))
+
+class OfflineRenderer(object):
+    """Renders what a GraphWin plays while the pointer follows a path,
+    without a sound card or a live pointer, and much faster than real
+    time.  The path is a sequence of (time in seconds, x, y) in screen
+    coordinates, in time order; the pointer stays put between points, and
+    a point outside the window is the pointer leaving it.  The same rules
+    as the live window decide what plays: the mouse voice, static, item
+    sounds and their volumes and panning (see GraphWin.runEngine), or
+    the window's VoiceMixer if it has one.  The output is at the mixer's
+    rate and number of channels: it is rendered in stereo, then spread
+    over the mixer's channels as AudioEngine.toChannels does."""
+
+    # Audio rendered after the last point of a path, in seconds
+    TAIL = 0.5
+
+    def __init__(self, win:GraphWin) -> None:
+        self.win = win
+        AudioEngine.init()
+        self.rate, _, self.channels = pygame.mixer.get_init()
+
+    @staticmethod
+    def _stereo(sound:Union[pygame.mixer.Sound, 'StreamedSound']) -> np.ndarray:
+        """The samples of SOUND, as an int16 array (frames, 2)."""
+        return AudioEngine.toChannels(_soundSamples(sound), 2)
+
+    def _mix(self, out:np.ndarray, samples:np.ndarray, pos:int,
+             gain:Tuple[float, float], limit:Optional[int] = None) -> int:
+        """Adds stereo SAMPLES, scaled by GAIN (left, right), to stereo
+        OUT, starting POS samples into SAMPLES looped forever, or stopping
+        after LIMIT samples.  Returns the position to continue from."""
+        n = len(out)
+        if gain == (0.0, 0.0) or len(samples) == 0:
+            return pos + n
+        index = np.arange(pos, pos + n)
+        if limit is not None:
+            n = max(0, min(n, limit - pos))
+            index = index[:n]
+        block = samples[index % len(samples)]
+        out[:n] += block * np.asarray(gain, dtype=np.float32)
+        return pos + len(out)
+
+    def render(self, path:List[Tuple[float, float, float]],
+               duration:Optional[float] = None) -> np.ndarray:
+        """Returns the audio for PATH as an int16 array (frames,
+        channels), DURATION seconds long (by default until TAIL seconds
+        after the last point)."""
+        win = self.win
+        times = np.asarray([p[0] for p in path], dtype=float)
+        xs = np.asarray([p[1] for p in path], dtype=float)
+        ys = np.asarray([p[2] for p in path], dtype=float)
+        if duration is None:
+            duration = (times[-1] if len(times) else 0.0) + OfflineRenderer.TAIL
+        frames = int(round(duration * self.rate))
+        starts = np.minimum(np.round(times * self.rate).astype(int), frames)
+        stops = np.append(starts[1:], frames)
+        width, height = win.getWidth(), win.getHeight()
+        within = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        with win._sceneLock:
+            tester = win.batchHitTester()
+            codes, which = tester.classify(xs, ys)
+        out = np.zeros((frames, 2), dtype=np.float32)
+        static = self._stereo(StaticNoise.getSound())
+        oscillator = StreamingOscillator() if win._oscillator is not None else None
+        mixer = VoiceMixer(win._voiceMixer.voices) if win._voiceMixer is not None else None
+
+        playing = False
+        bgPos = 0
+        mouseKey:Optional[int] = None
+        mouseSamples = static[:0]
+        mousePos = 0
+        mouseVolume = (1.0, 1.0)
+        itemSound = None
+        itemSamples = static[:0]
+        itemLimit:Optional[int] = None
+        itemPos = 0
+        itemVolume = (0.0, 0.0)
+        for i in range(len(times)):
+            block = out[starts[i]:stops[i]]
+            if not within[i]: # The pointer left: everything stops
+                playing = False
+                mouseKey = itemSound = None
+                if mixer is not None:
+                    mixer.clear()
+                continue
+            if not playing:
+                playing = True
+                bgPos = 0
+                if oscillator is not None:
+                    oscillator.setFrequency(Tone.mouseTone(1 - ys[i] / height))
+            Xprop, Yprop = xs[i] / width, ys[i] / height
+            item = tester.items[which[i]] if which[i] >= 0 else None
+            if codes[i] == SoundObject.INSIDE:
+                mouseVol, bgVol, itemVol = 0.0, 0.0, 1.0
+            elif codes[i] == SoundObject.NEAR:
+                mouseVol, bgVol, itemVol = 0.1, 0.1, 0.3
+            else:
+                mouseVol, bgVol, itemVol = 0.1, 0.5, 0.0
+                item = None
+            mouseVolume = (mouseVol * (1 - Xprop), mouseVol * Xprop)
+            sound = item.sound() if item is not None and mixer is None else None
+            if itemSound is None or itemSound != sound:
+                # The item channel's volume is only set when its sound starts
+                itemSound = sound
+                itemPos = 0
+                if isinstance(sound, (pygame.mixer.Sound, StreamedSound)):
+                    itemSamples = self._stereo(sound)
+                    loops = item.loops() # type: ignore
+                    itemLimit = None if loops < 0 else len(itemSamples) * (loops + 1)
+                    itemVolume = (itemVol * (1 - Xprop), itemVol * Xprop)
+                else:
+                    itemSamples = static[:0]
+            freq = Tone.mouseTone(1 - Yprop)
+            if oscillator is not None:
+                oscillator.setTarget(freq)
+                oscillator.setVolume(*mouseVolume)
+                voice = np.empty((len(block), 2), dtype=np.int16)
+                oscillator.render(voice)
+                block += voice
+            else:
+                key = win.toneBank.quantize(freq)
+                if key != mouseKey:
+                    mouseKey = key
+                    mouseSamples = self._stereo(win.toneBank.getSound(key))
+                    mousePos = 0
+                mousePos = self._mix(block, mouseSamples, mousePos, mouseVolume)
+            bgPos = self._mix(block, static, bgPos, (bgVol * (1 - Xprop), bgVol * Xprop))
+            if mixer is not None:
+                with win._sceneLock:
+                    hits = win._voiceHits(xs[i], ys[i])
+                mixer.setHits(hits, Xprop)
+                voice = np.empty((len(block), 2), dtype=np.int16)
+                mixer.render(voice)
+                block += voice
+            elif itemSound is not None:
+                itemPos = self._mix(block, itemSamples, itemPos, itemVolume, itemLimit)
+        np.clip(out, -Tone.MAX_SAMPLE - 1, Tone.MAX_SAMPLE, out=out)
+        return AudioEngine.toChannels(out.astype(np.int16), self.channels)
+
+    def write(self, filename:str, path:List[Tuple[float, float, float]],
+              duration:Optional[float] = None) -> float:
+        """Renders PATH to the WAV file FILENAME.  Returns its length in
+        seconds."""
+        samples = self.render(path, duration)
+        with wave.open(filename, 'wb') as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(samples.astype('<i2').tobytes())
+        return len(samples) / self.rate
+
+class SweepRenderer(object):
+    """Renders an overview of a whole GraphWin: a sweep across it, one
+    line of pixels (a column, left to right, or a row, top to bottom) at
+    a time, SECONDS long in all.  Each line is classified at once from a
+    HitRaster, and what it contains is heard the way the live window
+    would sound at its pixels, averaged over the line: static at 0.5
+    where it is outside every item and 0.1 where it is near one, and each
+    item's own sound at 1.0 over the pixels inside it and 0.3 over those
+    near it.  On top, the line is split into BANDS; each band with pixels
+    inside an item plays a tone at the Tone.mouseTone pitch of its
+    position, so the extent of shapes is heard as pitch.  Columns pan
+    from left to right.  The output is at the mixer's rate and number of
+    channels, built a block at a time with NumPy."""
+
+    TONE_LEVEL = 0.3 # Loudest the band tones get together
+    BLOCK = 8192 # Samples rendered at once
+
+    def __init__(self, win:GraphWin, bands:int = 32) -> None:
+        self.win = win
+        self.bands = bands
+        AudioEngine.init()
+        self.rate, _, self.channels = pygame.mixer.get_init()
+
+    def _labels(self) -> Tuple[np.ndarray, List[Optional['SoundObject']]]:
+        """The window's HitRaster labels, and the items they refer to."""
+        with self.win._sceneLock:
+            raster = self.win._raster
+            if raster is None:
+                raster = HitRaster(self.win)
+            raster.refresh()
+            return raster.labels.copy(), list(raster._items)
+
+    def render(self, seconds:float = 10.0, step:int = 1,
+               direction:str = 'columns') -> np.ndarray:
+        """Returns the sweep as an int16 array (frames, channels).  Every
+        STEP-th line is heard."""
+        assert direction in ('columns', 'rows')
+        labels, items = self._labels()
+        if direction == 'columns':
+            lines = labels.T[::step] # lines x positions, top to bottom
+            props = 1 - (np.arange(lines.shape[1]) + 0.5) / lines.shape[1]
+            pans = (np.arange(0, labels.shape[1], step) + 0.5) / labels.shape[1]
+        else:
+            lines = labels[::step] # left to right
+            props = (np.arange(lines.shape[1]) + 0.5) / lines.shape[1]
+            pans = np.full(len(lines), 0.5)
+        nlines, npos = lines.shape
+        total = int(round(seconds * self.rate))
+        # Sample times of the middle of each line, to interpolate between
+        centers = (np.arange(nlines) + 0.5) * total / nlines
+
+        inside = lines > 0
+        near = lines < 0
+        outsideFrac = 1 - (inside.sum(axis=1) + near.sum(axis=1)) / npos
+        staticGain = 0.5 * outsideFrac + 0.1 * near.mean(axis=1)
+        # Fraction of each band inside some item, scaled so that the band
+        # tones together never exceed TONE_LEVEL
+        bands = min(self.bands, npos)
+        starts = (np.arange(bands) * npos) // bands
+        sizes = np.diff(np.append(starts, npos))
+        bandFrac = np.add.reduceat(inside, starts, axis=1) / sizes
+        bandGain = bandFrac / np.maximum(bandFrac.sum(axis=1, keepdims=True), 1)
+        bandGain *= SweepRenderer.TONE_LEVEL
+        bandProps = np.add.reduceat(props, starts) / sizes
+        table = Wavetable.get('sine')
+        # Phase increments in 16.16 fixed point, in table entries per sample
+        incs = np.asarray([round(Tone.mouseTone(p) * Wavetable.SIZE * 65536 / self.rate)
+                           for p in bandProps], dtype=np.int64)
+
+        voices = [] # (samples, gain per line)
+        for k in np.unique(np.abs(lines)):
+            item = items[k - 1] if k > 0 else None
+            sound = item.sound() if item is not None else None
+            if isinstance(sound, (pygame.mixer.Sound, StreamedSound)):
+                gain = ((lines == k).sum(axis=1) + 0.3 * (lines == -k).sum(axis=1)) / npos
+                voices.append((_soundSamples(sound), gain))
+        static = _soundSamples(StaticNoise.getSound())
+
+        def envelope(t:np.ndarray, perLine:np.ndarray) -> np.ndarray:
+            """Per-line gains, interpolated to the sample times T."""
+            return np.interp(t, centers, perLine).astype(np.float32)
+
+        out = np.empty((total, self.channels), dtype=np.int16)
+        for start in range(0, total, SweepRenderer.BLOCK):
+            n = min(SweepRenderer.BLOCK, total - start)
+            t = np.arange(start, start + n)
+            # The lines this block interpolates between
+            span = slice(max(int(np.searchsorted(centers, start)) - 1, 0),
+                         int(np.searchsorted(centers, start + n)) + 1)
+            mix = np.zeros((n, self.channels), dtype=np.float32)
+            mix += static[t % len(static)] * envelope(t, staticGain)[:, np.newaxis]
+            for samples, gain in voices:
+                if gain[span].any():
+                    mix += samples[t % len(samples)] * envelope(t, gain)[:, np.newaxis]
+            active = np.nonzero(bandGain[span].any(axis=0))[0]
+            if len(active):
+                phase = (t[:, np.newaxis] * incs[active]) >> 16
+                phase &= Wavetable.SIZE - 1
+                gains = np.stack([envelope(t, bandGain[:, b]) for b in active], axis=1)
+                tone = (table.table[phase] * gains).sum(axis=1)
+                mix += tone[:, np.newaxis]
+            if self.channels == 2: # Pan as runEngine does
+                pan = envelope(t, pans)
+                mix[:, 0] *= 1 - pan
+                mix[:, 1] *= pan
+            np.clip(mix, -Tone.MAX_SAMPLE - 1, Tone.MAX_SAMPLE, out=mix)
+            out[start:start + n] = mix
+        return out
+
+    def sound(self, seconds:float = 10.0, step:int = 1,
+              direction:str = 'columns') -> pygame.mixer.Sound:
+        """The sweep as a Sound, ready to play."""
+        return AudioEngine.makeSound(self.render(seconds, step, direction))
+
+    def write(self, filename:str, seconds:float = 10.0, step:int = 1,
+              direction:str = 'columns') -> None:
+        """Writes the sweep to the WAV file FILENAME."""
+        samples = self.render(seconds, step, direction)
+        with wave.open(filename, 'wb') as f:
+            f.setnchannels(self.channels)
+            f.setsampwidth(2)
+            f.setframerate(self.rate)
+            f.writeframes(samples.astype('<i2').tobytes())
+
+class _MixerRate(object):
+    """Tone.SAMPLE_RATE, kept for code written before sounds were made at
+    the mixer's own rate: reads as that rate, with a DeprecationWarning."""
+
+    def __get__(self, obj:object, owner:type) -> int:
+        warnings.warn('Tone.SAMPLE_RATE is deprecated; use AudioEngine.format()[0]',
+                      DeprecationWarning, stacklevel=2)
+        return AudioEngine.format()[0]
 
 class Tone(object):
     # # Minimum and maximum frequencies in Hz
@@ -127,28 +1336,18 @@ class Tone(object):
     
     # RUMBLE_FREQ = 55
 
-    SAMPLE_RATE = 22050
+    SAMPLE_RATE = _MixerRate() # The mixer's rate; deprecated
     MAX_SAMPLE = 2 ** 15 - 1 # maximum value for any sample
 
-    def __init__(self, freq: float) -> None:
-        """FREQ is a frequency in Hertz(HZ)."""
-        # indicating the pitch as a
-        # geometric interpolation between [MIN_FREQ and MAX_FREQ]."""
-        # Clamp y to prevent seg-faulting
-        # if y < 0 or y > 1:
-        #     freq:float = Tone.MAX_FREQ * 4
-        # else:
-        #     freq = math.exp((1 - y) * Tone.LOG_MIN_FREQ + y * Tone.LOG_MAX_FREQ)
-    
-        # I want enough samples for 1 full cycle of the tone
-        length:float = 2 * Tone.SAMPLE_RATE / freq
-        omega:float = 2 * np.pi / length
-        xvalues = np.arange(int(length)) * omega
-        #print(np.obj2sctype(xvalues))
-        samples = Tone.MAX_SAMPLE * np.sin(xvalues)
-        stereo = np.resize(samples, (len(samples), 2))
-        self.sound:pygame.mixer.Sound = \
-            pygame.sndarray.make_sound(np.asarray(stereo, dtype=np.int16))
+    def __init__(self, freq: float, timbre:str = 'sine') -> None:
+        """FREQ is a frequency in Hertz(HZ); TIMBRE names a Wavetable.
+        The tone is synthesized at the mixer's rate, in its channels."""
+        table = Wavetable.get(timbre)
+        rate, _, channels = AudioEngine.format()
+        length, cycles = table.loopLength(freq, rate)
+        samples = np.empty((length, channels), dtype=np.int16)
+        table.fill(samples, cycles)
+        self.sound:pygame.mixer.Sound = AudioEngine.makeSound(samples)
 
     def getSound(self) -> pygame.mixer.Sound:
         return self.sound
@@ -170,15 +1369,1188 @@ class Tone(object):
     @staticmethod
     def silence(seconds:float = 1) -> pygame.mixer.Sound:
         """Creates and returns a silent Sound that is SECONDS seconds long (default 1)."""
-        length:int = int(seconds * Tone.SAMPLE_RATE)
-        sound = pygame.sndarray.make_sound(np.zeros((length, 2), dtype=np.int16));
+        rate, _, channels = AudioEngine.format()
+        length:int = int(seconds * rate)
+        sound = AudioEngine.makeSound(np.zeros((length, channels), dtype=np.int16));
         return sound
 
+class Wavetable(object):
+    """One cycle of a waveform, sampled at SIZE points as int16.  Tones
+    are made by stepping through the table with integer phase indices, so
+    building one is a single gather with no floating-point temporaries.
+    Loops are laid out to hold a whole number of cycles, so they repeat
+    without a click."""
+
+    SIZE = 2 ** 16 # Entries per cycle
+    MAX_CYCLES = 32 # Most cycles a loop may hold to get the pitch right
+    TOLERANCE = 1e-4 # Relative pitch error that's good enough (0.17 cents)
+
+    _tables:Dict[str, 'Wavetable'] = {}
+
+    def __init__(self, table:np.ndarray) -> None:
+        assert len(table) == Wavetable.SIZE and table.dtype == np.int16
+        self.table = table
+
+    @staticmethod
+    def get(timbre:str = 'sine') -> 'Wavetable':
+        """Returns the shared table for TIMBRE: 'sine', 'triangle',
+        'sawtooth' or 'square'."""
+        table = Wavetable._tables.get(timbre)
+        if table is None:
+            phase = np.arange(Wavetable.SIZE) / Wavetable.SIZE
+            if timbre == 'sine':
+                wave = np.sin(2 * np.pi * phase)
+            elif timbre == 'triangle':
+                wave = 1 - 4 * np.abs(((phase + 0.25) % 1) - 0.5)
+            elif timbre == 'sawtooth':
+                wave = 2 * ((phase + 0.5) % 1) - 1
+            elif timbre == 'square':
+                wave = np.where(phase < 0.5, 1.0, -1.0)
+            else:
+                raise ValueError('unknown timbre %r' % timbre)
+            table = Wavetable(np.round(wave * Tone.MAX_SAMPLE).astype(np.int16))
+            Wavetable._tables[timbre] = table
+        return table
+
+    @staticmethod
+    def loopLength(freq:float, rate:float) -> Tuple[int, int]:
+        """Returns (LENGTH, CYCLES): a loop of LENGTH samples at RATE holding
+        exactly CYCLES cycles, whose pitch is within TOLERANCE of FREQ if
+        up to MAX_CYCLES cycles allow, and otherwise as close as they get."""
+        period = rate / freq
+        best = (math.inf, 1, 1)
+        for cycles in range(1, Wavetable.MAX_CYCLES + 1):
+            exact = cycles * period
+            length = max(round(exact), 1)
+            error = abs(length - exact) / exact
+            if error < best[0]:
+                best = (error, length, cycles)
+                if error <= Wavetable.TOLERANCE:
+                    break
+        return best[1], best[2]
+
+    def fill(self, out:np.ndarray, cycles:int) -> None:
+        """Fills every channel of the int16 array OUT (samples, channels)
+        with exactly CYCLES cycles of the waveform."""
+        n = len(out)
+        index = np.arange(0, n * cycles * Wavetable.SIZE, cycles * Wavetable.SIZE,
+                          dtype=np.int64)
+        index //= n
+        index &= Wavetable.SIZE - 1 # SIZE is a power of two
+        wave = self.table[index]
+        for c in range(out.shape[1]):
+            out[:, c] = wave
+
+class BlockStream(object):
+    """Audio rendered BLOCK stereo samples at a time and fed to a channel
+    through Channel.queue, at the mixer's rate.  Blocks are rendered
+    in place into a ring of BUFFERS Sounds (or, if the mixer isn't 16-bit
+    stereo, rendered and then converted into them); with at most two of
+    them playing or queued, the next one is always free to overwrite.
+    Subclasses implement render."""
+
+    def __init__(self, block:int, buffers:int) -> None:
+        self.block = block
+        self.rate, size, channels = AudioEngine.format()
+        self._sounds:List[pygame.mixer.Sound] = []
+        self._buffers:List[np.ndarray] = []
+        for i in range(buffers):
+            sound = AudioEngine.makeSound(np.zeros((block, 2), dtype=np.int16))
+            self._sounds.append(sound)
+            self._buffers.append(pygame.sndarray.samples(sound))
+        self._scratch:Optional[np.ndarray] = None
+        if (size, channels) != (-16, 2):
+            self._scratch = np.zeros((block, 2), dtype=np.int16)
+        self._next = 0
+        self._ramp = np.arange(1, block + 1) / block
+
+    def render(self, out:np.ndarray) -> None:
+        """Renders the next len(OUT) samples into the stereo int16 array OUT."""
+        raise NotImplementedError
+
+    def nextSound(self) -> pygame.mixer.Sound:
+        """Renders the next block into the ring and returns its Sound."""
+        i = self._next
+        self._next = (i + 1) % len(self._sounds)
+        if self._scratch is None:
+            self.render(self._buffers[i])
+        else:
+            self.render(self._scratch)
+            self._buffers[i][...] = AudioEngine.toNative(self._scratch)
+        return self._sounds[i]
+
+    def pump(self, channel:pygame.mixer.Channel) -> None:
+        """Keeps CHANNEL playing one block with the next one queued."""
+        if not channel.get_busy():
+            channel.set_volume(1.0)
+            channel.play(self.nextSound())
+        if channel.get_queue() is None:
+            channel.queue(self.nextSound())
+
+class StreamingOscillator(BlockStream):
+    """Phase-continuous sine oscillator for the mouse voice.  Audio is
+    rendered BLOCK samples at a time from a running phase accumulator, with
+    the frequency gliding exponentially toward its target (time constant
+    GLIDE seconds), and fed to a channel through Channel.queue.  Pointer
+    updates only change the target frequency and volume, so nothing is
+    allocated or restarted when the pitch changes.  Volume and panning are
+    rendered into the samples, ramped across each block."""
+
+    AMPLITUDE = 0.5 # Fraction of full scale
+
+    def __init__(self, freq:float = 220, block:int = 512,
+                 glide:float = 0.02, buffers:int = 3) -> None:
+        BlockStream.__init__(self, block, buffers)
+        self.freq = freq
+        self.target = freq
+        self.phase = 0.0
+        self.glide = glide
+        self.volume = (0.0, 0.0) # left, right
+        self._rendered = self.volume # volume at the end of the last block
+
+    def setTarget(self, freq:float) -> None:
+        """Glides to FREQ (in Hz)."""
+        self.target = freq
+
+    def setFrequency(self, freq:float) -> None:
+        """Jumps to FREQ (in Hz) without gliding."""
+        self.freq = self.target = freq
+
+    def setVolume(self, left:float, right:float) -> None:
+        self.volume = (left, right)
+
+    def render(self, out:np.ndarray) -> None:
+        """Renders the next len(OUT) samples into the stereo int16 array OUT."""
+        n = len(out)
+        rate = self.rate
+        # Per-sample exponential approach to the target frequency
+        decay = math.exp(-1 / (self.glide * rate)) if self.glide > 0 else 0.0
+        freqs = self.target + (self.freq - self.target) * decay ** np.arange(1, n + 1)
+        phases = self.phase + np.cumsum(freqs) * (2 * math.pi / rate)
+        wave = np.sin(phases) * (Tone.MAX_SAMPLE * StreamingOscillator.AMPLITUDE)
+        ramp = self._ramp if n == self.block else np.arange(1, n + 1) / n
+        for c in (0, 1):
+            start = self._rendered[c]
+            gain = start + (self.volume[c] - start) * ramp
+            out[:, c] = wave * gain
+        self._rendered = self.volume
+        self.phase = float(phases[-1]) % (2 * math.pi)
+        self.freq = float(freqs[-1])
+
+class VoiceMixer(BlockStream):
+    """Mixes the sounds of up to VOICES items at once into one stereo
+    stream, for a single channel.  Pointer updates only set each item's
+    target gain and panning (setHits); every BLOCK samples, each voice
+    is gathered from its item's samples, at its own position, and added
+    in with its gain ramped toward the target, all with NumPy.  An item
+    that drops out of the hits fades out and is then forgotten, so it
+    starts from the beginning if it comes back."""
+
+    INSIDE_GAIN = 1.0
+    NEAR_GAIN = 0.3 # At the edge, falling to 0 at SoundObject.FRINGE
+
+    class _Voice(object):
+        def __init__(self, sound:Union[pygame.mixer.Sound, 'StreamedSound'],
+                     loops:int) -> None:
+            self.sound = sound
+            self.samples = _soundSamples(sound)
+            self.limit = None if loops < 0 else len(self.samples) * (loops + 1)
+            self.pos = 0
+            self.gain = (0.0, 0.0) # left, right, at the end of the last block
+            self.target = (0.0, 0.0)
+
+    def __init__(self, voices:int = 4, block:int = 1024, buffers:int = 3) -> None:
+        BlockStream.__init__(self, block, buffers)
+        self.voices = voices
+        self._voices:Dict['SoundObject', VoiceMixer._Voice] = {}
+
+    def __len__(self) -> int:
+        """The number of voices playing or fading out."""
+        return len(self._voices)
+
+    @staticmethod
+    def gain(code:int, distance:float) -> float:
+        """The gain of an item that a point is INSIDE or NEAR (CODE), at
+        DISTANCE screen pixels from its edge."""
+        if code == SoundObject.INSIDE:
+            return VoiceMixer.INSIDE_GAIN
+        return VoiceMixer.NEAR_GAIN * max(0.0, 1 - distance / SoundObject.FRINGE)
+
+    def setHits(self, hits:List[Tuple['SoundObject', int, float]],
+                Xprop:float) -> None:
+        """Plays the items in HITS, as (item, code, distance) from
+        _allHits, panned to XPROP across the window, and fades out the
+        rest.  If the gains add up to more than 1, they are scaled down
+        together to leave headroom."""
+        gains = [(item, VoiceMixer.gain(code, d)) for item, code, d in hits[:self.voices]]
+        total = sum(gain for _, gain in gains)
+        scale = 1 / total if total > 1 else 1.0
+        targets = {}
+        for item, gain in gains:
+            sound = item.sound()
+            if isinstance(sound, (pygame.mixer.Sound, StreamedSound)):
+                gain *= scale
+                targets[item] = (gain * (1 - Xprop), gain * Xprop)
+        for item, voice in self._voices.items():
+            voice.target = targets.pop(item, (0.0, 0.0))
+            if voice.target != (0.0, 0.0) and voice.sound is not item.sound():
+                # The item's sound has changed; start the new one
+                targets[item] = voice.target
+        for item, target in targets.items():
+            voice = VoiceMixer._Voice(item.sound(), item.loops()) # type: ignore
+            voice.target = target
+            self._voices[item] = voice
+
+    def clear(self) -> None:
+        """Silences every voice at once."""
+        self._voices.clear()
+
+    def render(self, out:np.ndarray) -> None:
+        n = len(out)
+        mix = np.zeros((n, 2), dtype=np.float32)
+        # Gains glide to their targets over (at most) one block
+        if n == self.block:
+            ramp = self._ramp
+        else:
+            ramp = np.minimum(np.arange(1, n + 1) / self.block, 1.0)
+        ramp = ramp.astype(np.float32)[:, np.newaxis]
+        for item, voice in list(self._voices.items()):
+            samples = voice.samples
+            stop = n if voice.limit is None else max(0, min(n, voice.limit - voice.pos))
+            if stop > 0 and len(samples) and (voice.gain != (0.0, 0.0)
+                                              or voice.target != (0.0, 0.0)):
+                index = np.arange(voice.pos, voice.pos + stop) % len(samples)
+                block = samples[index]
+                if block.shape[1] == 1:
+                    block = np.repeat(block, 2, axis=1)
+                start = np.asarray(voice.gain, dtype=np.float32)
+                gain = start + (np.asarray(voice.target, dtype=np.float32) - start) * ramp[:stop]
+                mix[:stop] += block[:, :2] * gain
+            voice.pos += n
+            voice.gain = voice.target
+            if voice.target == (0.0, 0.0):
+                del self._voices[item] # Faded out
+        np.clip(mix, -Tone.MAX_SAMPLE - 1, Tone.MAX_SAMPLE, out=mix)
+        out[:] = mix
+
+class StaticNoise(object):
+    """The background static, shared by every GraphWin.  It is loaded
+    from the pre-rendered FILENAME if that exists, and otherwise a short
+    loop of white noise is generated directly as int16 samples.  Either
+    way this happens once per process, and only when a window first
+    needs it."""
+
+    FILENAME = os.path.join(SOUND_DIR, 'bgstatic.wav')
+    SECONDS = 0.5 # Length of a generated loop
+    LEVEL = 0.05 # RMS level of generated noise, as a fraction of full scale
+
+    _sound:Optional[pygame.mixer.Sound] = None
+
+    @staticmethod
+    def getSound() -> pygame.mixer.Sound:
+        if StaticNoise._sound is None:
+            sound = None
+            if os.path.isfile(StaticNoise.FILENAME):
+                try:
+                    sound = loadSoundFile(StaticNoise.FILENAME)
+                except pygame.error:
+                    pass # Fall back on generating it
+            if sound is None:
+                sound = StaticNoise.generate()
+            StaticNoise._sound = sound
+        return StaticNoise._sound
+
+    @staticmethod
+    def generate(seconds:Optional[float] = None) -> pygame.mixer.Sound:
+        """Returns a new Sound of SECONDS seconds of white noise, in the
+        mixer's format.  Independent uniform samples loop seamlessly."""
+        if seconds is None:
+            seconds = StaticNoise.SECONDS
+        rate, _, channels = AudioEngine.format()
+        length = int(seconds * rate)
+        # A uniform distribution on [-a, a] has an RMS of a/sqrt(3)
+        limit = int(StaticNoise.LEVEL * math.sqrt(3) * Tone.MAX_SAMPLE)
+        samples = np.random.default_rng().integers(-limit, limit,
+                                                   size=(length, channels),
+                                                   dtype=np.int16, endpoint=True)
+        return AudioEngine.makeSound(samples)
+
+class ToneBank(object):
+    """Cache of Tones quantized to a pitch grid, so that the mouse voice
+    doesn't synthesize a new buffer on every motion event.  The grid is
+    laid out in steps of STEP cents upward from BASE_FREQ, and at most
+    CAPACITY tones are kept, evicting the least recently used."""
+
+    BASE_FREQ = 220 # bottom of the Tone.mouseTone range, in Hz
+
+    def __init__(self, step:float = 10, capacity:int = 128) -> None:
+        assert step > 0 and capacity > 0
+        self.step = step
+        self.capacity = capacity
+        self._tones:'OrderedDict[int, pygame.mixer.Sound]' = OrderedDict()
+
+    def quantize(self, freq:float) -> int:
+        """Returns the number of the grid step closest to FREQ (in Hz)."""
+        return int(round(1200 * math.log2(freq / ToneBank.BASE_FREQ) / self.step))
+
+    def frequency(self, key:int) -> float:
+        """Returns the frequency in Hz of grid step KEY."""
+        return ToneBank.BASE_FREQ * 2 ** (key * self.step / 1200)
+
+    def getSound(self, key:int) -> pygame.mixer.Sound:
+        """Returns the Sound for grid step KEY, synthesizing it if needed."""
+        sound = self._tones.get(key)
+        if sound is None:
+            sound = Tone(self.frequency(key)).getSound()
+            self._tones[key] = sound
+            if len(self._tones) > self.capacity:
+                self._tones.popitem(last=False)
+        else:
+            self._tones.move_to_end(key)
+        return sound
+
+    def precompute(self, minFreq:float = 220, maxFreq:float = 440) -> None:
+        """Synthesizes every grid step between MINFREQ and MAXFREQ ahead
+        of time (as far as the capacity allows)."""
+        for key in range(self.quantize(minFreq), self.quantize(maxFreq) + 1):
+            self.getSound(key)
+
+    def __len__(self) -> int:
+        return len(self._tones)
+
+class SoundRegistry(object):
+    """Process-wide cache that shares one Sound among everything made
+    from the same source, so that memory and loading time grow with the
+    number of distinct sounds rather than the number of objects.  Keys
+    say where a sound came from: ('tone', frequency), ('silence',
+    seconds) or ('file', path, modification time).  Once the sounds held
+    take more than BUDGET bytes, the least recently used are dropped from
+    the registry (objects still using them keep them)."""
+
+    def __init__(self, budget:int = 64 * 2**20) -> None:
+        self.budget = budget
+        self._sounds:'OrderedDict[Tuple, Tuple[pygame.mixer.Sound, int]]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key:Tuple, factory:Callable[[], pygame.mixer.Sound]) \
+            -> pygame.mixer.Sound:
+        """Returns the Sound registered under KEY, calling FACTORY to make
+        it if there isn't one."""
+        entry = self._sounds.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._sounds.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        sound = factory()
+        if isinstance(sound, StreamedSound):
+            size = sound.residentBytes()
+        else:
+            size = pygame.sndarray.samples(sound).nbytes
+        self._sounds[key] = (sound, size)
+        self.bytes += size
+        # Evict, but never the entry just added
+        while self.bytes > self.budget and len(self._sounds) > 1:
+            _, (_, evicted) = self._sounds.popitem(last=False)
+            self.bytes -= evicted
+        return sound
+
+    def tone(self, freq:float) -> pygame.mixer.Sound:
+        """A looping Tone of FREQ Hz."""
+        return self.get(('tone', float(freq)), lambda: Tone(freq).getSound())
+
+    def silence(self, seconds:float = 1) -> pygame.mixer.Sound:
+        return self.get(('silence', float(seconds)), lambda: Tone.silence(seconds))
+
+    def load(self, filename:str) -> pygame.mixer.Sound:
+        """The sound in the file FILENAME.  A file changed since it was
+        loaded is loaded again."""
+        path = os.path.abspath(filename)
+        key = ('file', path, os.path.getmtime(path))
+        return self.get(key, lambda: loadSoundFile(path))
+
+    def clear(self) -> None:
+        self._sounds.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {'sounds': len(self._sounds), 'bytes': self.bytes,
+                'budget': self.budget, 'hits': self.hits,
+                'misses': self.misses}
+
+    def __len__(self) -> int:
+        return len(self._sounds)
+
+# The registry shared by everything in this process
+soundRegistry = SoundRegistry()
+
+def loadSound(filename:str) -> pygame.mixer.Sound:
+    """Returns the sound in the file FILENAME, shared with every other
+    object that loads the same file."""
+    return soundRegistry.load(filename)
+
+def mapWav(filename:str) -> Optional[Tuple[np.ndarray, int]]:
+    """Memory-maps the uncompressed PCM WAV file FILENAME.  Returns its
+    samples as a read-only (frames, channels) array backed directly by the
+    file, and its sample rate; or None if the file isn't a WAV that can
+    be mapped (compressed, floating point, or an odd sample width)."""
+    with open(filename, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty file
+            return None
+    if mm[:4] != b'RIFF' or mm[8:12] != b'WAVE':
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(mm):
+        chunk, size = struct.unpack_from('<4sI', mm, pos)
+        pos += 8
+        if chunk == b'fmt ':
+            fmt = struct.unpack_from('<HHIIHH', mm, pos)
+            if fmt[0] == 0xFFFE: # WAVE_FORMAT_EXTENSIBLE
+                # The real format tag starts the SubFormat GUID, if present
+                tag = 0
+                if size >= 40 and struct.unpack_from('<H', mm, pos + 16)[0] >= 22:
+                    tag, = struct.unpack_from('<H', mm, pos + 24)
+                fmt = (tag,) + fmt[1:]
+        elif chunk == b'data' and fmt is not None:
+            tag, channels, rate, _, _, bits = fmt
+            if tag != 1 or bits not in (8, 16, 32): # Only PCM
+                return None
+            dtype = {8: np.uint8, 16: np.dtype('<i2'), 32: np.dtype('<i4')}[bits]
+            frames = min(size, len(mm) - pos) // (channels * bits // 8)
+            samples = np.frombuffer(mm, dtype=dtype, count=frames * channels,
+                                    offset=pos)
+            return samples.reshape(frames, channels), rate
+        pos += size + (size & 1) # Chunks are padded to even lengths
+    return None
+
+def _matchesMixer(samples:np.ndarray, rate:int) -> bool:
+    """Whether mapped SAMPLES at RATE are already in the mixer's format."""
+    freq, size, channels = AudioEngine.format()
+    return (rate == freq and size == -16 and samples.dtype.itemsize == 2
+            and samples.shape[1] == channels)
+
+def loadSoundFile(filename:str) -> Union[pygame.mixer.Sound, 'StreamedSound']:
+    """Loads the sound in FILENAME.  An uncompressed WAV already in the
+    mixer's format is memory-mapped and handed straight to the mixer, with
+    no decoding or intermediate copies; if it is longer than
+    StreamedSound.THRESHOLD bytes, it isn't loaded at all, but streamed
+    from the mapping as it plays.  One at the mixer's rate but with
+    another sample width or number of channels is converted from the
+    mapping with NumPy (see AudioEngine.toNative).  Anything else, such as
+    a WAV at another rate, is loaded by pygame, which converts and
+    resamples it as it loads.  Either way it is converted once; the
+    result is what SoundRegistry caches."""
+    mapped = mapWav(filename)
+    if mapped is not None:
+        samples, rate = mapped
+        if _matchesMixer(samples, rate):
+            if samples.nbytes > StreamedSound.THRESHOLD:
+                return StreamedSound(samples)
+            return pygame.mixer.Sound(buffer=memoryview(samples).cast('B'))
+        if rate == AudioEngine.format()[0]:
+            return AudioEngine.makeSound(samples)
+    return AudioEngine.loadSound(filename)
+
+class StreamedSound(object):
+    """A long sound played in CHUNK-frame pieces from a memory-mapped
+    file, so only a few chunks are ever resident.  Each playback has its
+    own SoundStream, which must be pumped to keep its channel fed."""
+
+    THRESHOLD = 2**20 # bytes
+    CHUNK = 8192 # frames
+
+    def __init__(self, samples:np.ndarray) -> None:
+        self.samples = samples
+
+    def get_length(self) -> float:
+        """Length in seconds, like pygame.mixer.Sound.get_length."""
+        return len(self.samples) / pygame.mixer.get_init()[0]
+
+    def residentBytes(self) -> int:
+        """Memory a playback holds on to: about two chunks."""
+        return 2 * StreamedSound.CHUNK * self.samples.strides[0]
+
+    def play(self, channel:pygame.mixer.Channel, loops:int = 0) -> 'SoundStream':
+        """Starts playing on CHANNEL, like Channel.play, and returns the
+        SoundStream to pump."""
+        stream = SoundStream(self, loops)
+        stream.pump(channel)
+        return stream
+
+class SoundStream(object):
+    """One playback of a StreamedSound."""
+
+    def __init__(self, streamed:StreamedSound, loops:int = 0) -> None:
+        self.streamed = streamed
+        self.loops = loops # Repeats left; -1 forever
+        self.pos = 0 # Next frame to queue
+        self.volume:Optional[Tuple[float, float]] = None # Reapplied on restart
+
+    def finished(self) -> bool:
+        return self.pos >= len(self.streamed.samples) and self.loops == 0
+
+    def _nextChunk(self) -> Optional[pygame.mixer.Sound]:
+        samples = self.streamed.samples
+        if self.pos >= len(samples):
+            if self.loops == 0:
+                return None
+            if self.loops > 0:
+                self.loops -= 1
+            self.pos = 0
+        chunk = samples[self.pos:self.pos + StreamedSound.CHUNK]
+        self.pos += len(chunk)
+        return pygame.mixer.Sound(buffer=memoryview(np.ascontiguousarray(chunk)).cast('B'))
+
+    def pump(self, channel:pygame.mixer.Channel) -> None:
+        """Keeps CHANNEL playing one chunk with the next one queued."""
+        if not channel.get_busy():
+            chunk = self._nextChunk()
+            if chunk is None:
+                return
+            channel.play(chunk)
+            if self.volume is not None:
+                channel.set_volume(*self.volume)
+        if channel.get_queue() is None:
+            chunk = self._nextChunk()
+            if chunk is not None:
+                channel.queue(chunk)
+
+def _firstHits(items, x:float, y:float) \
+        -> Tuple[Optional['SoundObject'], Optional['SoundObject'], int]:
+    """Tests ITEMS, from front to back, against screen point (x, y).
+    Returns the first item it is INSIDE, the first item it is NEAR (both
+    may be None) and the number of items tested.  Once the point is
+    INSIDE an item, nothing behind it is tested."""
+    insideItem = None
+    nearItem = None
+    tested = 0
+    for item in items:
+        tested += 1
+        contains = item.containsPt(x, y)
+        if contains == SoundObject.INSIDE:
+            insideItem = item
+            break
+        elif (contains == SoundObject.NEAR
+              and nearItem == None):
+            nearItem = item
+    return insideItem, nearItem, tested
+
+def _allHits(items, x:float, y:float, limit:int) \
+        -> Tuple[List[Tuple['SoundObject', int, float]], int]:
+    """Tests every one of ITEMS, given from front to back, against screen
+    point (x, y).  Returns up to LIMIT (item, code, distance) for the
+    items it is INSIDE (distance 0) or NEAR, nearest first and then front
+    first, and the number of items tested."""
+    hits = []
+    tested = 0
+    for item in items:
+        tested += 1
+        code = item.containsPt(x, y)
+        if code == SoundObject.INSIDE:
+            hits.append((0.0, tested, item, code))
+        elif code == SoundObject.NEAR:
+            hits.append((item.nearDistance(x, y), tested, item, code))
+    hits.sort(key=lambda hit: hit[:2])
+    return [(item, code, d) for d, _, item, code in hits[:limit]], tested
+
+class LinearHits(object):
+    """Reference hit-test backend: every sound item in the window is
+    tested, front to back.  Hit-test backends are told when sound items
+    are drawn (insert), undrawn (remove), moved or reshaped (update) and
+    when the transform changes (rebuild), and answer hitTest and
+    candidates."""
+
+    def __init__(self, win:GraphWin) -> None:
+        self.win = win
+
+    def insert(self, item:'SoundObject') -> None:
+        pass
+
+    def remove(self, item:'SoundObject') -> None:
+        pass
+
+    def update(self, item:'SoundObject') -> None:
+        pass
+
+    def rebuild(self, items:List['SoundObject']) -> None:
+        pass
+
+    def hitTest(self, x:float, y:float) \
+            -> Tuple[Optional['SoundObject'], Optional['SoundObject'], int]:
+        """See GraphWin._hitTest; also returns the number of items tested."""
+        return _firstHits(self.candidates(x, y), x, y)
+
+    def candidates(self, x:float, y:float) -> List['SoundObject']:
+        """Returns the items that might be INSIDE or NEAR screen point
+        (x, y), from front to back."""
+        return self.win.soundItems()[::-1]
+
+class SpatialGrid(object):
+    """Uniform grid over the screen-space bounding boxes of sound items,
+    each inflated by SoundObject.FRINGE, so that a motion event only has to
+    test the few items that could be INSIDE or NEAR the pointer.  Items
+    without a bounding box are candidates everywhere."""
+
+    def __init__(self, cellSize:int = 64) -> None:
+        self.cellSize = cellSize
+        self._cells:Dict[Tuple[int, int], List['SoundObject']] = {}
+        self._itemCells:Dict['SoundObject', List[Tuple[int, int]]] = {}
+        self._unbounded:List['SoundObject'] = []
+        # Stacking order: later-drawn items are in front
+        self._order:Dict['SoundObject', int] = {}
+        self._counter = 0
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._itemCells.clear()
+        self._unbounded.clear()
+        self._order.clear()
+
+    def insert(self, item:'SoundObject') -> None:
+        """Adds ITEM in front of everything already in the grid."""
+        self._counter += 1
+        self._order[item] = self._counter
+        self._bin(item)
+
+    def remove(self, item:'SoundObject') -> None:
+        if item in self._order:
+            self._unbin(item)
+            del self._order[item]
+
+    def rebuild(self, items:List['SoundObject']) -> None:
+        """Re-bins ITEMS (given from back to front), as after setCoords."""
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    def update(self, item:'SoundObject') -> None:
+        """Re-bins ITEM after it has moved, keeping its stacking order."""
+        if item in self._order:
+            self._unbin(item)
+            self._bin(item)
+
+    def candidates(self, x:float, y:float) -> List['SoundObject']:
+        """Returns the items that might be INSIDE or NEAR screen point
+        (x, y), from front to back."""
+        key = (int(x // self.cellSize), int(y // self.cellSize))
+        items = self._cells.get(key, []) + self._unbounded
+        items.sort(key=self._order.__getitem__, reverse=True)
+        return items
+
+    def hitTest(self, x:float, y:float) \
+            -> Tuple[Optional['SoundObject'], Optional['SoundObject'], int]:
+        return _firstHits(self.candidates(x, y), x, y)
+
+    def _bin(self, item:'SoundObject') -> None:
+        bbox = item.screenBBox()
+        if bbox is None:
+            self._unbounded.append(item)
+            return
+        # One extra pixel absorbs rounding to integer screen coordinates
+        margin = SoundObject.FRINGE + 1
+        x1 = int((bbox[0] - margin) // self.cellSize)
+        y1 = int((bbox[1] - margin) // self.cellSize)
+        x2 = int((bbox[2] + margin) // self.cellSize)
+        y2 = int((bbox[3] + margin) // self.cellSize)
+        keys = [(i, j) for i in range(x1, x2 + 1) for j in range(y1, y2 + 1)]
+        for key in keys:
+            self._cells.setdefault(key, []).append(item)
+        self._itemCells[item] = keys
+
+    def _unbin(self, item:'SoundObject') -> None:
+        keys = self._itemCells.pop(item, None)
+        if keys is None:
+            self._unbounded.remove(item)
+            return
+        for key in keys:
+            cell = self._cells[key]
+            cell.remove(item)
+            if not cell:
+                del self._cells[key]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+# Any of the hit-test backends
+HitBackend = Union['LinearHits', 'SpatialGrid', 'HitRaster']
+
+class HitRaster(object):
+    """Per-pixel hit-test results for a GraphWin, so that a pointer
+    update is a single array lookup.  Each pixel's label is 0 if it is
+    OUTSIDE every sound item, k if it is INSIDE item k (the topmost such),
+    or -k if it is only NEAR item k (the topmost such), exactly as
+    GraphWin._hitTest would find.  Labels are filled in by BatchHitTester,
+    a TILE-pixel square at a time against only the items that reach it.
+    Drawing, undrawing or moving an item marks just the region it covered
+    and covers as stale; it is re-rasterized at the next lookup."""
+
+    TILE = 64
+
+    def __init__(self, win:GraphWin) -> None:
+        self.win = win
+        self.width = int(win.getWidth())
+        self.height = int(win.getHeight())
+        self.labels = np.zeros((self.height, self.width), dtype=np.int16)
+        self._items:List[Optional['SoundObject']] = [] # label k -> _items[k - 1]
+        self._ids:Dict['SoundObject', int] = {}
+        self._regions:Dict['SoundObject', Optional[Tuple[int, int, int, int]]] = {}
+        self._dirty:List[Tuple[int, int, int, int]] = []
+        self._stale = True # Whether everything must be rebuilt
+        # Counters
+        self.rebuilds = 0
+        self.updates = 0
+        self.pixels = 0 # Pixels classified
+
+    def _region(self, item:'SoundObject') -> Optional[Tuple[int, int, int, int]]:
+        """The pixels (x1, y1, x2, y2), half-open, that ITEM can make
+        INSIDE or NEAR, or None if that's unknown."""
+        bbox = item.screenBBox()
+        if bbox is None:
+            return None
+        margin = SoundObject.FRINGE + 1
+        return (max(int(math.floor(bbox[0] - margin)), 0),
+                max(int(math.floor(bbox[1] - margin)), 0),
+                min(int(math.ceil(bbox[2] + margin)) + 1, self.width),
+                min(int(math.ceil(bbox[3] + margin)) + 1, self.height))
+
+    def _touch(self, region:Optional[Tuple[int, int, int, int]]) -> None:
+        if region is None:
+            self._stale = True
+        elif region[0] < region[2] and region[1] < region[3]:
+            self._dirty.append(region)
+
+    def insert(self, item:'SoundObject') -> None:
+        if len(self._items) + 1 > np.iinfo(self.labels.dtype).max:
+            self._stale = True # Out of labels; the rebuild renumbers
+            return
+        self._items.append(item)
+        self._ids[item] = len(self._items)
+        self._regions[item] = self._region(item)
+        self._touch(self._regions[item])
+
+    def remove(self, item:'SoundObject') -> None:
+        if item in self._ids:
+            self._items[self._ids.pop(item) - 1] = None
+            self._touch(self._regions.pop(item))
+
+    def update(self, item:'SoundObject') -> None:
+        """Re-rasterizes ITEM where it was and where it is now."""
+        if item in self._ids:
+            self._touch(self._regions[item])
+            self._regions[item] = self._region(item)
+            self._touch(self._regions[item])
+
+    def invalidate(self) -> None:
+        """Marks everything stale."""
+        self._stale = True
+
+    def rebuild(self, items:List['SoundObject']) -> None:
+        self.invalidate() # Done lazily, at the next lookup
+
+    def nbytes(self) -> int:
+        return self.labels.nbytes
+
+    def stats(self) -> Dict[str, int]:
+        return {'bytes': self.nbytes(), 'width': self.width, 'height': self.height,
+                'items': len(self._ids), 'rebuilds': self.rebuilds,
+                'updates': self.updates, 'pixels': self.pixels}
+
+    def refresh(self) -> None:
+        """Brings the labels up to date."""
+        if not self._stale and not self._dirty:
+            return
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in self._dirty)
+        if self._stale or area >= self.width * self.height:
+            self._rebuild()
+        else:
+            for region in self._dirty:
+                self._rasterize(region)
+                self.updates += 1
+        self._dirty.clear()
+
+    def _rebuild(self) -> None:
+        items = self.win.soundItems()
+        dtype = np.int16 if len(items) < np.iinfo(np.int16).max else np.int32
+        if self.labels.dtype != dtype:
+            self.labels = np.zeros((self.height, self.width), dtype=dtype)
+        self._items = list(items)
+        self._ids = {item: k + 1 for k, item in enumerate(items)}
+        self._regions = {item: self._region(item) for item in items}
+        self._rasterize((0, 0, self.width, self.height))
+        self._stale = False
+        self.rebuilds += 1
+
+    def _rasterize(self, region:Tuple[int, int, int, int]) -> None:
+        # The scene's stacking order, with each item's reach
+        items = [item for item in self.win.soundItems() if item in self._ids]
+        reach = [self._regions[item] for item in items]
+        x1, y1, x2, y2 = region
+        tile = HitRaster.TILE
+        for ty in range(y1, y2, tile):
+            for tx in range(x1, x2, tile):
+                bx, by = min(tx + tile, x2), min(ty + tile, y2)
+                local = [item for item, r in zip(items, reach) if r is None
+                         or (r[0] < bx and tx < r[2] and r[1] < by and ty < r[3])]
+                if not local:
+                    self.labels[ty:by, tx:bx] = 0
+                    continue
+                ys, xs = np.mgrid[ty:by, tx:bx]
+                codes, which = BatchHitTester(local).classify(xs.ravel(), ys.ravel())
+                ids = np.asarray([self._ids[item] for item in local] + [0])
+                labels = ids[which] # which == -1 picks the 0
+                labels[codes == SoundObject.NEAR] *= -1
+                self.labels[ty:by, tx:bx] = labels.reshape(by - ty, bx - tx)
+                self.pixels += (by - ty) * (bx - tx)
+
+    def hitTest(self, x:float, y:float) \
+            -> Tuple[Optional['SoundObject'], Optional['SoundObject'], int]:
+        """Looks up pixel (x, y); no items are tested.  A point that isn't
+        a pixel of the window is tested against every item."""
+        if not (0 <= x < self.width and 0 <= y < self.height) \
+                or x != int(x) or y != int(y):
+            return _firstHits(reversed(self.win.soundItems()), x, y)
+        self.refresh()
+        label = int(self.labels[int(y), int(x)])
+        if label > 0:
+            return self._items[label - 1], None, 0
+        elif label < 0:
+            return None, self._items[-label - 1], 0
+        return None, None, 0
+
+    def candidates(self, x:float, y:float) -> List['SoundObject']:
+        """Labels only record the topmost item, so these are the items
+        whose reach covers (x, y), from front to back."""
+        self.refresh()
+        result = []
+        for item in reversed(self.win.soundItems()):
+            r = self._regions.get(item)
+            if r is None or (r[0] <= x < r[2] and r[1] <= y < r[3]):
+                result.append(item)
+        return result
+
+class BatchHitTester(object):
+    """Struct-of-arrays snapshot of the screen-space geometry of a list of
+    sound items (given from back to front), grouped by shape, which
+    classifies many points against all of the items in a few vectorized
+    passes.  Polygons are tested with their own PolygonKernel, and items
+    whose GEOMETRY isn't one of the known kinds fall back to their own
+    containsPt."""
+
+    KINDS = ('box', 'circle', 'oval', 'line')
+
+    # Upper bound on points x items evaluated at once, to bound memory
+    CHUNK = 1 << 20
+
+    def __init__(self, items:List['SoundObject']) -> None:
+        self.items = list(items)
+        indices:Dict[str, List[int]] = {kind: [] for kind in BatchHitTester.KINDS}
+        params:Dict[str, List[Tuple[float, ...]]] = {kind: [] for kind in BatchHitTester.KINDS}
+        self._others:List[int] = []
+        self._polygons:List[Tuple[int, PolygonKernel]] = []
+        for i, item in enumerate(self.items):
+            if item.GEOMETRY == 'polygon':
+                self._polygons.append((i, item.screenGeometry()[0]))
+            elif item.GEOMETRY in indices:
+                indices[item.GEOMETRY].append(i)
+                params[item.GEOMETRY].append(item.screenGeometry())
+            else:
+                self._others.append(i)
+        # kind -> (column indices, one parameter array per geometry field)
+        self._groups:Dict[str, Tuple[np.ndarray, List[np.ndarray]]] = {}
+        for kind in BatchHitTester.KINDS:
+            if indices[kind]:
+                cols = np.asarray(params[kind], dtype=float).T
+                self._groups[kind] = (np.asarray(indices[kind]), list(cols))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def classify(self, xs:Union[np.ndarray, List[float]],
+                 ys:Union[np.ndarray, List[float]]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Classifies the screen points (xs[i], ys[i]).  Returns an array of
+        results (SoundObject.INSIDE, NEAR or OUTSIDE) and an array of
+        indices into self.items (-1 for OUTSIDE), chosen just as
+        GraphWin._onMouseMove does: the topmost item the point is INSIDE,
+        or failing that the topmost item it is NEAR."""
+        xs = np.asarray(xs, dtype=float).ravel()
+        ys = np.asarray(ys, dtype=float).ravel()
+        assert xs.shape == ys.shape
+        codes = np.full(len(xs), SoundObject.OUTSIDE, dtype=np.int8)
+        which = np.full(len(xs), -1, dtype=np.intp)
+        if not self.items:
+            return codes, which
+        step = max(1, BatchHitTester.CHUNK // len(self.items))
+        for start in range(0, len(xs), step):
+            stop = start + step
+            codes[start:stop], which[start:stop] = \
+                self._classifyChunk(xs[start:stop], ys[start:stop])
+        return codes, which
+
+    def hitTest(self, x:float, y:float) \
+            -> Tuple[Optional['SoundObject'], Optional['SoundObject']]:
+        """Single-point version of classify, with the same result as
+        GraphWin._hitTest."""
+        codes, which = self.classify([x], [y])
+        item = self.items[which[0]] if which[0] >= 0 else None
+        if codes[0] == SoundObject.INSIDE:
+            return item, None
+        return None, item
+
+    def _classifyChunk(self, xs:np.ndarray, ys:np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        # One row per point, one column per item, back to front
+        table = np.zeros((len(xs), len(self.items)), dtype=np.int8)
+        x = xs[:, np.newaxis]
+        y = ys[:, np.newaxis]
+        for kind, (cols, fields) in self._groups.items():
+            classifier = getattr(BatchHitTester, '_classify_' + kind)
+            table[:, cols] = classifier(x, y, *fields)
+        for i, kernel in self._polygons:
+            table[:, i] = kernel.classifyMany(xs, ys)
+        for i in self._others:
+            item = self.items[i]
+            table[:, i] = [item.containsPt(px, py) for px, py in zip(xs, ys)]
+        return BatchHitTester._topmost(table)
+
+    @staticmethod
+    def _topmost(table:np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Reduces a points x items table of results to the winning result
+        and item index for each point."""
+        last = table.shape[1] - 1
+        codes = np.full(table.shape[0], SoundObject.OUTSIDE, dtype=np.int8)
+        which = np.full(table.shape[0], -1, dtype=np.intp)
+        # Search from the front (the last column) for each kind of hit
+        for code in (SoundObject.NEAR, SoundObject.INSIDE):
+            hits = (table == code)[:, ::-1]
+            found = hits.any(axis=1)
+            codes[found] = code
+            which[found] = last - hits.argmax(axis=1)[found]
+        return codes, which
+
+    @staticmethod
+    def _codes(inside:np.ndarray, near:np.ndarray) -> np.ndarray:
+        return np.where(inside, SoundObject.INSIDE,
+                        np.where(near, SoundObject.NEAR, SoundObject.OUTSIDE))
+
+    @staticmethod
+    def _classify_box(x:np.ndarray, y:np.ndarray, cx:np.ndarray,
+                      cy:np.ndarray, halfwidth:np.ndarray,
+                      halfheight:np.ndarray) -> np.ndarray:
+        dx = np.abs(cx - x)
+        dy = np.abs(cy - y)
+        fringe = SoundObject.FRINGE
+        inside = (dx <= halfwidth) & (dy <= halfheight)
+        near = (dx <= halfwidth + fringe) & (dy <= halfheight + fringe)
+        return BatchHitTester._codes(inside, near)
+
+    @staticmethod
+    def _classify_circle(x:np.ndarray, y:np.ndarray, cx:np.ndarray,
+                         cy:np.ndarray, r:np.ndarray) -> np.ndarray:
+        outside = np.hypot(x - cx, y - cy) - r
+        return BatchHitTester._codes(outside <= 0,
+                                     outside <= SoundObject.FRINGE)
+
+    @staticmethod
+    def _classify_oval(x:np.ndarray, y:np.ndarray, cx:np.ndarray,
+                       cy:np.ndarray, halfwidth:np.ndarray,
+                       halfheight:np.ndarray) -> np.ndarray:
+        codes = BatchHitTester._classify_box(x, y, cx, cy, halfwidth, halfheight)
+        # Refine INSIDE the bounding box to INSIDE the ellipse
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = (x - cx)**2/halfwidth**2 + (y - cy)**2/halfheight**2
+        codes[(codes == SoundObject.INSIDE) & (k > 1)] = SoundObject.NEAR
+        return codes
+
+    @staticmethod
+    def _classify_line(x:np.ndarray, y:np.ndarray, x1:np.ndarray,
+                       y1:np.ndarray, x2:np.ndarray, y2:np.ndarray) -> np.ndarray:
+        d = BatchHitTester.segmentDistance(x, y, x1, y1, x2, y2)
+        return BatchHitTester._codes(d == 0, d < SoundObject.FRINGE)
+
+    @staticmethod
+    def segmentDistance(x:np.ndarray, y:np.ndarray, x1:np.ndarray,
+                        y1:np.ndarray, x2:np.ndarray, y2:np.ndarray) -> np.ndarray:
+        """Vectorized SoundObject.distToLineSeg: the distance from each point
+        (x, y) to each segment (x1, y1)-(x2, y2), all in screen space."""
+        dx = x2 - x1
+        dy = y2 - y1
+        length = np.hypot(dx, dy)
+        # Distance to the line, where the point projects onto the segment
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d = np.abs(dx * (y - y1) - dy * (x - x1)) / length
+        # Distance to an endpoint, where it projects beyond one
+        before = dx * (x - x1) + dy * (y - y1) < 0
+        after = dx * (x - x2) + dy * (y - y2) > 0
+        d = np.where(before | (length == 0), np.hypot(x - x1, y - y1), d)
+        return np.where(after & ~before, np.hypot(x - x2, y - y2), d)
+
+class PolygonKernel(object):
+    """A polygon's screen-space edges, compiled into arrays once so that
+    the crossing-number (INSIDE) and minimum edge distance (NEAR) tests
+    each take a single vectorized pass.  Edges are (x1, y1, x2, y2).
+
+    Polygons with more than BUCKET_THRESHOLD edges also get their edges
+    sorted into horizontal bands, so a point is only tested against the
+    edges whose y-extent reaches its band, keeping the cost well below
+    linear in the vertex count for traced outlines.  Small polygons are
+    tested with plain Python, which is faster than NumPy at that size."""
+
+    SMALL = 16
+    BUCKET_THRESHOLD = 64
+
+    def __init__(self, edges:List[Tuple[float, float, float, float]]) -> None:
+        self.edges = [tuple(edge) for edge in edges]
+        e = np.asarray(self.edges, dtype=float).reshape(-1, 4)
+        self.x1, self.y1, self.x2, self.y2 = [np.ascontiguousarray(c) for c in e.T]
+        self.dx = self.x2 - self.x1
+        self.dy = self.y2 - self.y1
+        self.length = np.hypot(self.dx, self.dy)
+        # Inverse slope, used for the crossing x; horizontal edges never
+        # cross a horizontal ray, so their (infinite) values aren't used
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.dxdy = self.dx / self.dy
+        self.fringe = SoundObject.FRINGE
+        if len(self.edges) > 0:
+            self.bbox:Optional[Tuple[float, float, float, float]] = \
+                (e[:, [0, 2]].min(), e[:, [1, 3]].min(),
+                 e[:, [0, 2]].max(), e[:, [1, 3]].max())
+        else:
+            self.bbox = None
+        self._bands:Optional[List[np.ndarray]] = None
+        self._nearBands:Optional[List[np.ndarray]] = None
+        if len(self.edges) > PolygonKernel.BUCKET_THRESHOLD:
+            self._makeBands()
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def _makeBands(self) -> None:
+        assert self.bbox is not None
+        count = int(math.sqrt(len(self.edges)))
+        self._ymin = self.bbox[1]
+        self._bandHeight = max((self.bbox[3] - self.bbox[1]) / count, 1.0)
+        ylo = np.minimum(self.y1, self.y2)
+        yhi = np.maximum(self.y1, self.y2)
+        self._bands = []
+        self._nearBands = []
+        for b in range(count):
+            lo = self._ymin + b * self._bandHeight
+            hi = lo + self._bandHeight
+            # Edges that can cross a ray in this band, and edges that can
+            # be within the fringe of a point in this band
+            self._bands.append(np.flatnonzero((ylo <= hi) & (yhi >= lo)))
+            self._nearBands.append(np.flatnonzero((ylo <= hi + self.fringe)
+                                                  & (yhi >= lo - self.fringe)))
+
+    def _band(self, y:float) -> int:
+        assert self._bands is not None
+        b = int((y - self._ymin) // self._bandHeight)
+        return min(max(b, 0), len(self._bands) - 1)
+
+    def classify(self, x:float, y:float) -> int:
+        """Returns SoundObject.INSIDE, NEAR or OUTSIDE for screen point
+        (x, y), as Polygon.containsPt."""
+        fringe = SoundObject.FRINGE
+        if self.bbox is None \
+                or x < self.bbox[0] - fringe or x > self.bbox[2] + fringe \
+                or y < self.bbox[1] - fringe or y > self.bbox[3] + fringe:
+            return SoundObject.OUTSIDE
+        if len(self.edges) <= PolygonKernel.SMALL:
+            return self._classifySmall(x, y)
+        if self._bands is not None:
+            b = self._band(y)
+            cross = self._bands[b]
+            near = self._nearBands[b] if fringe == self.fringe else None # type: ignore
+        else:
+            cross = near = None
+        if self.crossings(x, y, cross) % 2 == 1:
+            return SoundObject.INSIDE
+        if self.distance(x, y, near) < fringe:
+            return SoundObject.NEAR
+        return SoundObject.OUTSIDE
+
+    def _classifySmall(self, x:float, y:float) -> int:
+        intersections = 0
+        for x1, y1, x2, y2 in self.edges:
+            # Half-open in y, so shared vertices count once and horizontal
+            # edges not at all
+            if (y1 > y) != (y2 > y) \
+                    and x1 + (y - y1) * (x2 - x1) / (y2 - y1) >= x:
+                intersections += 1
+        if intersections % 2 == 1:
+            return SoundObject.INSIDE
+        mindist = min(SoundObject.segmentDistance(x, y, x1, y1, x2, y2)
+                      for x1, y1, x2, y2 in self.edges)
+        if mindist < SoundObject.FRINGE:
+            return SoundObject.NEAR
+        return SoundObject.OUTSIDE
+
+    def crossings(self, x:float, y:float,
+                  which:Optional[np.ndarray] = None) -> int:
+        """Counts the edges (optionally only those indexed by WHICH) that
+        cross the ray from (x, y) toward +x."""
+        x1, y1, y2, dxdy = self.x1, self.y1, self.y2, self.dxdy
+        if which is not None:
+            x1, y1, y2, dxdy = x1[which], y1[which], y2[which], dxdy[which]
+        spans = (y1 > y) != (y2 > y)
+        with np.errstate(invalid='ignore'):
+            return int(np.count_nonzero(spans & (x1 + (y - y1) * dxdy >= x)))
+
+    def distance(self, x:float, y:float,
+                 which:Optional[np.ndarray] = None) -> float:
+        """Returns the distance from (x, y) to the nearest edge (optionally
+        only among those indexed by WHICH)."""
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        if which is not None:
+            if len(which) == 0:
+                return math.inf
+            x1, y1, x2, y2 = x1[which], y1[which], x2[which], y2[which]
+        if len(x1) == 0:
+            return math.inf
+        return float(BatchHitTester.segmentDistance(x, y, x1, y1, x2, y2).min())
+
+    def classifyMany(self, xs:np.ndarray, ys:np.ndarray) -> np.ndarray:
+        """Vectorized classify for arrays of points."""
+        xs = np.asarray(xs, dtype=float).reshape(-1, 1)
+        ys = np.asarray(ys, dtype=float).reshape(-1, 1)
+        codes = np.full(len(xs), SoundObject.OUTSIDE, dtype=np.int8)
+        if self.bbox is None:
+            return codes
+        # Only points within FRINGE of the bounding box can be NEAR
+        left, top, right, bottom = self.bbox
+        f = SoundObject.FRINGE
+        reach = ((xs > left - f) & (xs < right + f)
+                 & (ys > top - f) & (ys < bottom + f)).ravel()
+        if not reach.all():
+            codes[reach] = self.classifyMany(xs[reach], ys[reach])
+            return codes
+        spans = (self.y1 > ys) != (self.y2 > ys)
+        with np.errstate(invalid='ignore'):
+            hits = spans & (self.x1 + (ys - self.y1) * self.dxdy >= xs)
+        inside = hits.sum(axis=1) % 2 == 1
+        d = BatchHitTester.segmentDistance(xs, ys, self.x1, self.y1,
+                                           self.x2, self.y2).min(axis=1)
+        codes[d < SoundObject.FRINGE] = SoundObject.NEAR
+        codes[inside] = SoundObject.INSIDE
+        return codes
+
 class SoundObject(g.GraphicsObject):
     def __init__(self, 
                  sound:Union[pygame.mixer.Sound,str,float,None]=None,
                  text:Optional[str]=None) -> None:
         self._sound:Optional[pygame.mixer.Sound] = None
+        # Cached screenGeometry, and the transform it was computed under
+        self._geometry:Optional[Tuple] = None
+        self._geometryTrans:Optional[g.Transform] = None
+        self._speechText:Optional[str] = None # Text of a spoken sound
+        # SOUND, if it says how to make the sound (a number or a text)
+        self._soundArg:Union[float, str, None] = None
 
         if sound != None:
             if hasattr(sound, 'play'): # sound is a Sound
@@ -186,19 +2558,26 @@ class SoundObject(g.GraphicsObject):
                 self._loops:int = -1
             elif isinstance(sound, str): #sound is a string
                 if len(sound) > 0:
-                    self._sound = self.textToSpeech(sound)
+                    self._speechText = sound
+                    self._soundArg = sound
                     self._loops = 0
+                    try:
+                        self._sound = self.textToSpeech(sound)
+                    except FileNotFoundError as e:
+                        # Stay silent rather than synthesize during startup
+                        warnings.warn(str(e))
             elif isinstance(sound, float) or isinstance(sound,int):
                 # Make a tone out of it
                 y:float = float(sound)
+                self._soundArg = y
                 if y > 0:
-                    self._sound = Tone(y).getSound()
+                    self._sound = soundRegistry.tone(y)
                 else: # sound of silence
                     if y < 0:
                         y = -y
                     else:
                         y = 1.0
-                    self._sound = Tone.silence(y)
+                    self._sound = soundRegistry.silence(y)
                 self._loops = -1
 
     @staticmethod
@@ -208,16 +2587,27 @@ class SoundObject(g.GraphicsObject):
         result = ''.join(c for c in result if c in keepchars)
         return result
 
+    # Where textToSpeech finds pre-rendered speech (see sound_speech.py)
+    speechCache = sound_speech.SpeechCache()
+
     @staticmethod
     def textToSpeech(text:str) -> pygame.mixer.Sound:
-        fname = SoundObject.textToFilename(text)
-        #print(fname)
-        wavname = os.path.join('sounds', fname + '.wav')
-        print(wavname)
-        # If the WAV file doesn't exist already, create it
-        if not os.path.isfile(wavname):
-            raise Exception('WAV does not exist.')
-        return pygame.mixer.Sound(wavname)
+        """Returns TEXT as speech, from a clip rendered ahead of time by
+        sound_speech.py.  Raises FileNotFoundError if there is no clip;
+        nothing is ever synthesized here."""
+        wavname = SoundObject.speechCache.lookup(text)
+        if wavname is None:
+            # Clips named the old way, before the speech cache
+            fname = SoundObject.textToFilename(text)
+            wavname = os.path.join('sounds', fname + '.wav')
+            if not os.path.isfile(wavname):
+                raise FileNotFoundError('No speech rendered for %r; '
+                                        'run sound_speech.py to render it.' % text)
+        return soundRegistry.load(wavname)
+
+    def speechText(self) -> Optional[str]:
+        """Returns the text this object speaks, or None."""
+        return self._speechText
 
     @staticmethod
     def distanceL2(x1:float, y1:float, x2:float, y2:float) -> float:
@@ -254,6 +2644,13 @@ class SoundObject(g.GraphicsObject):
         if self.canvas and not self.canvas.isClosed() and self.canvas.trans:
             x,y = self.canvas.toScreen(x, y)
         return int(x),int(y)
+
+    def ptToScreen(self, pt:g.Point) -> Tuple[float, float]:
+        """Like ptToScreenTuple, but without truncating untransformed
+        coordinates to integers."""
+        if self.canvas:
+            return self.canvas.toScreen(pt.getX(), pt.getY())
+        return pt.getX(), pt.getY()
     
     # Note that the final containsPt and distance calculation must be in screen space!  
     # Only in screen space can the fringe be expected to be the same in X and Y.  (The Circle
@@ -321,10 +2718,117 @@ class SoundObject(g.GraphicsObject):
             d = abs(p1p2.cross(p1p)/p1p2.length())
         return d
 
+    # Shape family of screenGeometry, for BatchHitTester; None means the
+    # object can only be tested through containsPt
+    GEOMETRY:Optional[str] = None
+
+    def screenGeometry(self) -> Tuple:
+        """Returns the screen-space parameters of this object's shape, laid
+        out as BatchHitTester expects for GEOMETRY:
+          'box':    center x, center y, half width, half height
+          'circle': center x, center y, radius
+          'oval':   the 'box' parameters of the bounding box
+          'line':   x1, y1, x2, y2
+          'polygon': a PolygonKernel for its edges
+        The result is computed once and reused until the object moves, is
+        drawn or undrawn, or its window's transform changes."""
+        trans = self.canvas.trans if self.canvas else None
+        if self._geometry is None or self._geometryTrans is not trans:
+            self._geometry = self._computeGeometry()
+            self._geometryTrans = trans
+        return self._geometry
+
+    def invalidateGeometry(self) -> None:
+        """Discards the cached screenGeometry."""
+        self._geometry = None
+
+    def _computeGeometry(self) -> Tuple:
+        """Computes screenGeometry from scratch.  Subclasses with a GEOMETRY
+        should override this."""
+        raise NotImplementedError
+
+    def _boxGeometry(self, centerPt:g.Point, width:float, height:float) \
+            -> Tuple[float, float, float, float]:
+        """Screen-space 'box' geometry tested by boxContains, given the same
+        world-space arguments."""
+        cx,cy = self.ptToScreenTuple(centerPt)
+        return cx, cy, self.scaleX(width)/2, self.scaleY(height)/2
+
+    def _bBoxGeometry(self) -> Tuple[float, float, float, float]:
+        """Screen-space 'box' geometry tested by bBoxContains."""
+        p1 = self.getP1() #  type: ignore
+        p2 = self.getP2() #  type: ignore
+        width = abs(p1.getX() - p2.getX())
+        height = abs(p1.getY() - p2.getY())
+        centerPt = g.Point((p1.getX() + p2.getX())/2, (p1.getY() + p2.getY())/2)
+        return self._boxGeometry(centerPt, width, height)
+
+    def draw(self, graphwin:g.GraphWin) -> 'SoundObject':
+        self.invalidateGeometry()
+        return super().draw(graphwin)
+
+    def undraw(self) -> None:
+        super().undraw()
+        self.invalidateGeometry()
+
+    def move(self, dx:float, dy:float) -> None:
+        canvas = self.canvas
+        if canvas and not canvas.isClosed() and isinstance(canvas, GraphWin):
+            with canvas._sceneLock:
+                super().move(dx, dy)
+                self.invalidateGeometry()
+                canvas._itemMoved(self)
+        else:
+            super().move(dx, dy)
+            self.invalidateGeometry()
+
+    def screenBBox(self) -> Optional[Tuple[float, float, float, float]]:
+        """Returns the (left, top, right, bottom) screen-space box around
+        everything containsPt could call INSIDE, or None if unknown."""
+        if self.GEOMETRY in ('box', 'oval'):
+            cx, cy, halfwidth, halfheight = self.screenGeometry()
+            halfwidth = abs(halfwidth)
+            halfheight = abs(halfheight)
+            return cx - halfwidth, cy - halfheight, cx + halfwidth, cy + halfheight
+        elif self.GEOMETRY == 'circle':
+            cx, cy, r = self.screenGeometry()
+            r = abs(r)
+            return cx - r, cy - r, cx + r, cy + r
+        elif self.GEOMETRY == 'line':
+            x1, y1, x2, y2 = self.screenGeometry()
+            return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        return None
+
+    @staticmethod
+    def boxCode(x:float, y:float, cx:float, cy:float, halfwidth:float,
+                halfheight:float) -> int:
+        """boxContains for a box already in screen space."""
+        dx = abs(cx - x)
+        dy = abs(cy - y)
+        if dx <= halfwidth and dy <= halfheight:
+            return SoundObject.INSIDE
+        elif dx <= (halfwidth+SoundObject.FRINGE) and dy <= (halfheight+SoundObject.FRINGE):
+            return SoundObject.NEAR
+        return SoundObject.OUTSIDE
+
+    @staticmethod
+    def segmentDistance(x:float, y:float, x1:float, y1:float,
+                        x2:float, y2:float) -> float:
+        """distToLineSeg for a segment already in screen space."""
+        dx = x2 - x1
+        dy = y2 - y1
+        # If (x, y) is behind (x1, y1), distance is distance to (x1, y1)
+        if dx * (x - x1) + dy * (y - y1) < 0 or (dx == 0 and dy == 0):
+            return math.hypot(x - x1, y - y1)
+        elif dx * (x - x2) + dy * (y - y2) > 0: # (x2, y2) is closest
+            return math.hypot(x - x2, y - y2)
+        # Else, project onto the line
+        return abs(dx * (y - y1) - dy * (x - x1)) / math.hypot(dx, dy)
+
     def hasSound(self) -> bool:
         return self._sound != None
 
-    def sound(self) -> Optional[pygame.mixer.Sound]:
+    def sound(self) -> Optional[Union[pygame.mixer.Sound, StreamedSound]]:
         return self._sound
         
     def loops(self) -> int:
@@ -336,6 +2840,34 @@ class SoundObject(g.GraphicsObject):
         or 0 if the point is farther from the object.  Subclasses should
         override this method."""
         return SoundObject.OUTSIDE
+
+    def nearDistance(self, x:float, y:float) -> float:
+        """Returns how far screen point (x, y), which containsPt finds
+        NEAR, is from the edge of this object, in pixels (between 0 and
+        FRINGE).  Distances are measured the way containsPt measures them
+        for the object's GEOMETRY, so boxes use the larger of the x and y
+        distances, and an oval the distance along the ray from its center."""
+        fringe = SoundObject.FRINGE
+        if self.GEOMETRY == 'box':
+            cx, cy, halfwidth, halfheight = self.screenGeometry()
+            d = max(abs(x - cx) - abs(halfwidth), abs(y - cy) - abs(halfheight))
+        elif self.GEOMETRY == 'oval':
+            cx, cy, xr, yr = self.screenGeometry()
+            d = max(abs(x - cx) - abs(xr), abs(y - cy) - abs(yr))
+            if d <= 0 and xr and yr: # Within the bounding box
+                k = math.sqrt((x - cx)**2/xr**2 + (y - cy)**2/yr**2)
+                d = math.hypot(x - cx, y - cy) * (1 - 1 / k) if k > 1 else 0.0
+        elif self.GEOMETRY == 'circle':
+            cx, cy, r = self.screenGeometry()
+            d = math.hypot(x - cx, y - cy) - abs(r)
+        elif self.GEOMETRY == 'line':
+            d = SoundObject.segmentDistance(x, y, *self.screenGeometry())
+        elif self.GEOMETRY == 'polygon':
+            kernel, = self.screenGeometry()
+            d = kernel.distance(x, y)
+        else:
+            d = fringe / 2 # Unknown; call it halfway
+        return min(max(d, 0.0), fringe)
         
 class Point(SoundObject, g.Point):
     def __init__(self, x:float, y:float, 
@@ -345,7 +2877,13 @@ class Point(SoundObject, g.Point):
         g.Point.__init__(self, x, y)
 
     def containsPt(self, x:float, y:float) -> int:
-        return self.boxContains(self, 0, 0, x, y)
+        cx, cy, halfwidth, halfheight = self.screenGeometry()
+        return SoundObject.boxCode(x, y, cx, cy, halfwidth, halfheight)
+
+    GEOMETRY = 'box'
+
+    def _computeGeometry(self) -> Tuple:
+        return self._boxGeometry(self, 0, 0)
 
 
 class Line(SoundObject, g.Line):
@@ -358,7 +2896,8 @@ class Line(SoundObject, g.Line):
     def containsPt(self, x:float, y:float) -> int:
         """Finds the distance from the point (x, y) to this line, by projecting
         (x, y) onto the line."""
-        d = self.distToLineSeg(x, y, self.getP1(), self.getP2())
+        x1, y1, x2, y2 = self.screenGeometry()
+        d = SoundObject.segmentDistance(x, y, x1, y1, x2, y2)
         result = SoundObject.OUTSIDE
         if d == 0:
             result = SoundObject.INSIDE
@@ -367,6 +2906,11 @@ class Line(SoundObject, g.Line):
         # print(scr_p1, scr_p2, p, p1p.dot(p1p2), p1p.angle_to(p1p2), p2p.dot(p2p1), p2p.angle_to(p2p1), d, result)
         return result
 
+    GEOMETRY = 'line'
+
+    def _computeGeometry(self) -> Tuple:
+        return self.ptToScreen(self.getP1()) + self.ptToScreen(self.getP2())
+
 class Circle(SoundObject, g.Circle):
     def __init__(self, center:g.Point, radius:float, 
                  sound:Union[pygame.mixer.Sound,str,float,None]=None,
@@ -376,16 +2920,21 @@ class Circle(SoundObject, g.Circle):
 
     def containsPt(self, x:float, y:float) -> int:
         result = SoundObject.OUTSIDE
-        cx,cy = self.ptToScreenTuple(self.getCenter())
-        # if we're drawing circles, xscale and yscale better be similar
-        r = self.scaleX(self.getRadius())
-        outside = self.distanceL2(x, y, cx, cy) - r
+        cx, cy, r = self.screenGeometry()
+        outside = math.hypot(x - cx, y - cy) - r
         if outside <= 0:
             result = SoundObject.INSIDE
         elif outside <= SoundObject.FRINGE:
             result = SoundObject.NEAR
         return result
 
+    GEOMETRY = 'circle'
+
+    def _computeGeometry(self) -> Tuple:
+        cx,cy = self.ptToScreenTuple(self.getCenter())
+        # if we're drawing circles, xscale and yscale better be similar
+        return cx, cy, self.scaleX(self.getRadius())
+
 class Rectangle(SoundObject, g.Rectangle):
     def __init__(self, p1:g.Point, p2:g.Point, 
                  sound:Union[pygame.mixer.Sound,str,float,None] = None,
@@ -394,7 +2943,13 @@ class Rectangle(SoundObject, g.Rectangle):
         g.Rectangle.__init__(self, p1, p2)
 
     def containsPt(self, x:float, y:float) -> int:
-        return self.bBoxContains(x, y)
+        cx, cy, halfwidth, halfheight = self.screenGeometry()
+        return SoundObject.boxCode(x, y, cx, cy, halfwidth, halfheight)
+
+    GEOMETRY = 'box'
+
+    def _computeGeometry(self) -> Tuple:
+        return self._bBoxGeometry()
 
 # TODO: Fix containsPt
 class Oval(SoundObject, g.Oval):
@@ -408,19 +2963,22 @@ class Oval(SoundObject, g.Oval):
 
     def containsPt(self, x:float, y:float) -> int:
         # Should really be more precise
-        result = self.bBoxContains(x, y)
+        cx, cy, xr, yr = self.screenGeometry()
+        result = SoundObject.boxCode(x, y, cx, cy, xr, yr)
         # If result is OUTSIDE or NEAR, use it.
         # If result is INSIDE, refine it.
         if result == SoundObject.INSIDE:
-            cx,cy = self.ptToScreenTuple(self.getCenter())
-            xr = self.scaleX(self._xr)
-            yr = self.scaleY(self._yr)
             k = (x - cx)**2/xr**2 + (y - cy)**2/yr**2
             if k > 1:
                 result = SoundObject.NEAR
             # Otherwise, result is already INSIDE
         return result
 
+    GEOMETRY = 'oval'
+
+    def _computeGeometry(self) -> Tuple:
+        return self._bBoxGeometry()
+
 #TODO: Figure out containment from the start
 class Polygon(SoundObject, g.Polygon):
     def __init__(self, *points,
@@ -430,31 +2988,18 @@ class Polygon(SoundObject, g.Polygon):
         g.Polygon.__init__(self, list(points))
 
     def containsPt(self, x:float, y:float) -> int:
-        result:int = SoundObject.OUTSIDE
-        # Is it INSIDE?
-        ## Intersect each line segment with the ray from (x, y) to +x
-        intersections:int = 0
-        for i in range(len(self.points)):
-            start:Tuple[int, int] = self.ptToScreenTuple(self.points[i])
-            end:Tuple[int, int] = self.ptToScreenTuple(self.points[(i+1) % len(self.points)])
-            if ((start[1] - y) * (end[1] - y) <= 0) \
-                and (start[0] >= x or end[0] >= x) \
-                and ((start[0] + (((y - start[1])*(end[0] - start[0]))/(end[1] - start[1]))) \
-                      >= x):
-                intersections += 1
-        if (intersections % 2) == 1: # Odd number of intersections
-            result = SoundObject.INSIDE
-        else:        
-            # Is it NEAR?
-            mindist:float = self.distToLineSeg(x, y, self.points[-1], 
-                                                self.points[0])
-            for i in range(len(self.points)-1):
-                dist:float = self.distToLineSeg(x, y, self.points[i], self.points[i+1])
-                mindist = min(mindist, dist)
-            if mindist < SoundObject.FRINGE:
-                result = SoundObject.NEAR
-        # Otherwise, it's OUTSIDE
-        return result
+        kernel, = self.screenGeometry()
+        return kernel.classify(x, y)
+
+    GEOMETRY = 'polygon'
+
+    def _computeGeometry(self) -> Tuple:
+        pts = [self.ptToScreenTuple(p) for p in self.points]
+        return (PolygonKernel([pts[i-1] + pts[i] for i in range(len(pts))]),)
+
+    def screenBBox(self) -> Optional[Tuple[float, float, float, float]]:
+        kernel, = self.screenGeometry()
+        return kernel.bbox
 
     # Constants
     RIGHT:int = 1
@@ -503,13 +3048,56 @@ class Polygon(SoundObject, g.Polygon):
         return Polygon(p0, p1, p2, sound=snd)
                   
     
+class TextMetrics(object):
+    """Pixel sizes of Text labels, measured with the Tk font and kept
+    for the CAPACITY most recently used (face, size, style, text).  Without
+    Tk fonts (as under soundgraphicsheadless), sizes are estimated from
+    the point size instead."""
+
+    def __init__(self, capacity:int = 1024) -> None:
+        self.capacity = capacity
+        self._sizes:'OrderedDict[Tuple, Tuple[int, int]]' = OrderedDict()
+        self._fonts:Dict[Tuple, object] = {}
+
+    def _font(self, face:str, size:int, style:str):
+        key = (face, size, style)
+        font = self._fonts.get(key)
+        if font is None:
+            import tkinter.font
+            font = tkinter.font.Font(root=g._root, family=face, size=size,
+                                     weight='bold' if 'bold' in style else 'normal',
+                                     slant='italic' if 'italic' in style else 'roman')
+            self._fonts[key] = font
+        return font
+
+    def measure(self, face:str, size:int, style:str, text:str) -> Tuple[int, int]:
+        """Returns the (width, height) in pixels of TEXT, as drawn."""
+        key = (face, size, style, text)
+        extents = self._sizes.get(key)
+        if extents is not None:
+            self._sizes.move_to_end(key)
+            return extents
+        lines = text.split('\n')
+        try:
+            font = self._font(face, size, style)
+            width = max(font.measure(line) for line in lines) # type: ignore
+            height = font.metrics('linespace') * len(lines) # type: ignore
+        except (ImportError, AttributeError, g.tk.TclError):
+            pixels = size * 96 / 72 # Points at 96 dpi
+            width = int(math.ceil(0.6 * pixels * max(len(line) for line in lines)))
+            height = int(math.ceil(1.2 * pixels * len(lines)))
+        extents = (width, height)
+        self._sizes[key] = extents
+        if len(self._sizes) > self.capacity:
+            self._sizes.popitem(last=False)
+        return extents
+
 class Text(SoundObject, g.Text):
     def __init__(self, p:g.Point, text:str, 
                 sound:Union[pygame.mixer.Sound,str,float,None]=None, 
                 updateSound:bool=False) -> None:
         SoundObject.__init__(self, sound, text)
         g.Text.__init__(self, p, text)
-        print()
         self._updateSound = updateSound
 
 #   def setText(self, newtext):
@@ -518,16 +3106,39 @@ class Text(SoundObject, g.Text):
 #           self._sound = self.textToSpeech(newtext)
 
     def containsPt(self, x:float, y:float) -> int:
-        # Total wild guess at the dimensions.
-        # With access to the font, I *can* do better
-        width:float = 100
-        height:float = 30
+        cx, cy, halfwidth, halfheight = self.screenGeometry()
+        return SoundObject.boxCode(x, y, cx, cy, halfwidth, halfheight)
+
+    GEOMETRY = 'box'
+
+    def _computeGeometry(self) -> Tuple:
+        width, height = self._worldExtents()
+        return self._boxGeometry(self.getAnchor(), width, height)
+
+    # Measurements of (face, size, style, text), shared by every Text
+    metrics = TextMetrics()
+
+    def _reconfig(self, option:str, setting) -> None:
+        super()._reconfig(option, setting)
+        if option in ('text', 'font'):
+            # setText, setFace, setSize and setStyle all come through here
+            canvas = self.canvas
+            if canvas and not canvas.isClosed() and isinstance(canvas, GraphWin):
+                with canvas._sceneLock:
+                    self.invalidateGeometry()
+                    canvas._itemMoved(self)
+            else:
+                self.invalidateGeometry()
+
+    def _worldExtents(self) -> Tuple[float, float]:
+        face, size, style = self.config['font']
+        width, height = Text.metrics.measure(face, size, style, self.getText())
         # Convert dims to world space, so boxContains can convert them back
         if self.canvas and not self.canvas.isClosed() and self.canvas.trans:
             xfm = self.canvas.trans
             width *= xfm.xscale
             height *= xfm.yscale
-        return self.boxContains(self.getAnchor(), width, height, x, y)
+        return width, height
 
 # TODO: implement
 class Entry(g.Entry):
@@ -541,8 +3152,14 @@ class Image(SoundObject, g.Image):
         g.Image.__init__(self, p, filename)
 
     def containsPt(self, x:float, y:float) -> int:
-        return self.boxContains(self.getAnchor(), self.getWidth(), 
-                self.getHeight(), x, y)
+        cx, cy, halfwidth, halfheight = self.screenGeometry()
+        return SoundObject.boxCode(x, y, cx, cy, halfwidth, halfheight)
+
+    GEOMETRY = 'box'
+
+    def _computeGeometry(self) -> Tuple:
+        return self._boxGeometry(self.getAnchor(), self.getWidth(),
+                                 self.getHeight())
 
 def color_rgb(r:int, green:int, b:int) -> str:
     return g.color_rgb(r, green, b)
@@ -555,11 +3172,11 @@ def test() -> None:
     win.setCoords(0,0,10,10)
     t = Text(g.Point(5,5), "Centered Text", sound=0)
     t.draw(win)
-    p = Polygon(g.Point(1,1), g.Point(5,3), g.Point(2,7), sound=pygame.mixer.Sound('sounds/C5-Horn.wav'))
+    p = Polygon(g.Point(1,1), g.Point(5,3), g.Point(2,7), sound=loadSound('sounds/C5-Horn.wav'))
     p.draw(win)
     e = Entry(g.Point(5,6), 10)
     e.draw(win)
-    tri = Polygon.makeEqTriangle(g.Point(5, 5), 25, Polygon.LEFT, pygame.mixer.Sound('sounds/C5-Horn.wav'))
+    tri = Polygon.makeEqTriangle(g.Point(5, 5), 25, Polygon.LEFT, loadSound('sounds/C5-Horn.wav'))
     tri.draw(win)
     win.getMouse()
     p.setFill("red")
@@ -595,13 +3212,15 @@ def test() -> None:
     t.setSize(20)
     win.getMouse()
     win.close()
-    pygame.quit()
 
 #MacOS fix 2
 #tk.Toplevel(_root).destroy()
 
-# MacOS fix 1
-update()
+# Time taken to import this module, and the most it is allowed to take.
+# Importing must not start Tk windows or pygame; graphics.py itself still
+# creates its hidden Tk root when imported.
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+IMPORT_BUDGET = 0.5
 
 if __name__ == "__main__":
     test()
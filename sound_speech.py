@@ -0,0 +1,269 @@
+# Pre-rendered speech clips for sound_graphics.py
+#
+# Speech is synthesized ahead of time, never while a window is starting up.
+# Each clip is stored under a hash of its text and the voice settings that
+# rendered it, so different texts never collide and changing the voice
+# renders fresh clips.  This module deliberately doesn't import graphics.py
+# or pygame, so it can run (and be imported by worker processes) without a
+# display or an audio device.
+#
+# Usage:  python sound_speech.py [options] TEXT...
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import wave
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Directory of the sounds shipped with sound_graphics.py
+SOUND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
+
+class SpeechBackend(object):
+    """A text-to-speech synthesizer for SpeechCache.  Backends are sent to
+    worker processes, so they must be picklable; keep any heavy imports
+    inside render."""
+
+    # Name recorded in the voice settings
+    NAME = 'none'
+
+    def settings(self) -> Dict[str, object]:
+        """Returns every setting that affects the rendered audio.  These
+        are part of each clip's cache key."""
+        return {'backend': self.NAME}
+
+    def render(self, text:str, filename:str) -> None:
+        """Writes TEXT, spoken, to the WAV file FILENAME."""
+        raise NotImplementedError
+
+class GTTSBackend(SpeechBackend):
+    """Google Text-to-Speech, through gTTS.  gTTS produces MP3, which is
+    converted to WAV with FFmpeg, so both must be installed (and gTTS needs
+    the network)."""
+
+    NAME = 'gtts'
+
+    def __init__(self, lang:str = 'en', tld:str = 'com', slow:bool = False) -> None:
+        self.lang = lang
+        self.tld = tld
+        self.slow = slow
+
+    def settings(self) -> Dict[str, object]:
+        return {'backend': self.NAME, 'lang': self.lang, 'tld': self.tld,
+                'slow': self.slow}
+
+    def render(self, text:str, filename:str) -> None:
+        from gtts import gTTS # type: ignore
+        mp3name = filename + '.mp3'
+        try:
+            gTTS(text, lang=self.lang, tld=self.tld, slow=self.slow).save(mp3name)
+            subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', mp3name,
+                            filename], check=True)
+        finally:
+            if os.path.exists(mp3name):
+                os.remove(mp3name)
+
+class BeepBackend(SpeechBackend):
+    """Offline stand-in for a real synthesizer: each word becomes a short
+    beep whose pitch depends on the word.  Useful for tests and for
+    machines without network access."""
+
+    NAME = 'beep'
+    SAMPLE_RATE = 22050
+
+    def __init__(self, wordSeconds:float = 0.12, gapSeconds:float = 0.04) -> None:
+        self.wordSeconds = wordSeconds
+        self.gapSeconds = gapSeconds
+
+    def settings(self) -> Dict[str, object]:
+        return {'backend': self.NAME, 'word': self.wordSeconds,
+                'gap': self.gapSeconds}
+
+    def render(self, text:str, filename:str) -> None:
+        rate = BeepBackend.SAMPLE_RATE
+        t = np.arange(int(self.wordSeconds * rate)) / rate
+        # Fade each beep in and out to avoid clicks
+        envelope = np.sin(np.pi * t / self.wordSeconds)
+        gap = np.zeros(int(self.gapSeconds * rate))
+        pieces = [gap]
+        for word in text.split():
+            digest = hashlib.sha1(word.encode('utf-8')).digest()
+            freq = 300 + 600 * digest[0] / 255
+            pieces.append(0.5 * envelope * np.sin(2 * math.pi * freq * t))
+            pieces.append(gap)
+        samples = (np.concatenate(pieces) * 32767).astype('<i2')
+        with wave.open(filename, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes(samples.tobytes())
+
+BACKENDS = {GTTSBackend.NAME: GTTSBackend, BeepBackend.NAME: BeepBackend}
+
+def _renderClip(backend:SpeechBackend, text:str, filename:str) -> str:
+    """Renders one clip (in a worker process).  The clip is written under a
+    temporary name and then renamed, so a reader never sees half a file."""
+    directory = os.path.dirname(filename)
+    fd, tmpname = tempfile.mkstemp(suffix='.wav', dir=directory)
+    os.close(fd)
+    try:
+        backend.render(text, tmpname)
+        os.replace(tmpname, filename)
+    finally:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+    return filename
+
+class SpeechCache(object):
+    """Content-addressed store of pre-rendered speech clips.  Each clip is
+    DIRECTORY/<hash>.wav, where the hash covers the text and the backend's
+    voice settings, and DIRECTORY/manifest.json maps each hash back to its
+    text and settings, and records the voice rendered in last."""
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory:Optional[str] = None,
+                 backend:Optional[SpeechBackend] = None) -> None:
+        if directory is None:
+            directory = os.path.join(SOUND_DIR, 'speech')
+        if backend is None:
+            backend = GTTSBackend()
+        self.directory = directory
+        self.backend = backend
+        # Manifest texts, and the manifest's mtime and size when read
+        self._texts:Optional[Tuple[Optional[Tuple[int, int]], Dict[str, str]]] = None
+
+    def key(self, text:str) -> str:
+        """Returns the hash that names the clip for TEXT."""
+        blob = json.dumps({'text': text, 'voice': self.backend.settings()},
+                          sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+    def path(self, text:str) -> str:
+        """Returns the filename where the clip for TEXT is (or would be)."""
+        return os.path.join(self.directory, self.key(text) + '.wav')
+
+    def lookup(self, text:str) -> Optional[str]:
+        """Returns the filename of the clip for TEXT, or None if it hasn't
+        been rendered.  A clip in this cache's voice comes first; failing
+        that, the manifest is searched for TEXT in any voice, preferring
+        the one the directory was last rendered in, so that clips rendered
+        with another backend (sound_speech.py -b beep) are found.  This
+        never synthesizes anything."""
+        filename = self.path(text)
+        if os.path.isfile(filename):
+            return filename
+        filename = self._byText().get(text)
+        return filename if filename is not None and os.path.isfile(filename) else None
+
+    def _byText(self) -> Dict[str, str]:
+        """Returns a dictionary from each text in the manifest to its clip's
+        filename, reading the manifest again only if it has changed."""
+        try:
+            stat = os.stat(os.path.join(self.directory, SpeechCache.MANIFEST))
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        if self._texts is None or self._texts[0] != version:
+            manifest = self._load()
+            latest = manifest.get('voice')
+            texts:Dict[str, str] = {}
+            # The latest voice goes last, so it wins
+            for clip in sorted(manifest.get('clips', {}).values(),
+                               key=lambda clip: clip.get('voice') == latest):
+                texts[clip['text']] = os.path.join(self.directory, clip['file'])
+            self._texts = (version, texts)
+        return self._texts[1]
+
+    def missing(self, texts:Iterable[str]) -> List[str]:
+        """Returns the distinct TEXTS that have no clip in this cache's
+        voice yet, in order."""
+        result:List[str] = []
+        seen = set()
+        for text in texts:
+            if text and text not in seen and not os.path.isfile(self.path(text)):
+                result.append(text)
+            seen.add(text)
+        return result
+
+    def prerender(self, texts:Iterable[str],
+                  workers:Optional[int] = None) -> Dict[str, str]:
+        """Renders the clips missing for TEXTS, using a pool of WORKERS
+        processes (default: one per CPU), and records them in the manifest.
+        Returns a dictionary from each text to its clip's filename."""
+        texts = [text for text in texts if text]
+        todo = self.missing(texts)
+        if todo:
+            os.makedirs(self.directory, exist_ok=True)
+            with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_renderClip, self.backend, text,
+                                       self.path(text)) for text in todo]
+                for future in futures:
+                    future.result() # Re-raises a worker's exception
+            self._record(todo)
+        return {text: self.path(text) for text in texts}
+
+    def manifest(self) -> Dict[str, Dict[str, object]]:
+        """Returns the manifest: a dictionary from each clip's hash to its
+        text, voice settings and filename."""
+        return self._load().get('clips', {})
+
+    def _load(self) -> Dict[str, object]:
+        try:
+            with open(os.path.join(self.directory, SpeechCache.MANIFEST),
+                      encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _record(self, texts:List[str]) -> None:
+        clips = self.manifest()
+        for text in texts:
+            key = self.key(text)
+            clips[key] = {'text': text, 'voice': self.backend.settings(),
+                          'file': key + '.wav'}
+        filename = os.path.join(self.directory, SpeechCache.MANIFEST)
+        tmpname = filename + '.tmp'
+        with open(tmpname, 'w', encoding='utf-8') as f:
+            # The voice rendered in last, which lookup prefers
+            json.dump({'version': 1, 'voice': self.backend.settings(),
+                       'clips': clips}, f, indent=1, sort_keys=True,
+                      ensure_ascii=False)
+        os.replace(tmpname, filename)
+
+def main(args:List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description='Pre-render speech clips for sound_graphics.')
+    parser.add_argument('texts', nargs='*', metavar='TEXT',
+                        help='text to render')
+    parser.add_argument('-f', '--file', action='append', default=[],
+                        help='file of texts to render, one per line')
+    parser.add_argument('-b', '--backend', choices=sorted(BACKENDS),
+                        default=GTTSBackend.NAME)
+    parser.add_argument('-d', '--dir', default=None,
+                        help='clip directory (default: sounds/speech)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes')
+    options = parser.parse_args(args[1:])
+
+    texts = list(options.texts)
+    for name in options.file:
+        with open(name, encoding='utf-8') as f:
+            texts.extend(line.strip() for line in f)
+    cache = SpeechCache(options.dir, BACKENDS[options.backend]())
+    todo = cache.missing(texts)
+    cache.prerender(texts, options.workers)
+    print('%d clip(s) rendered, %d already cached, in %s'
+          % (len(todo), len(set(t for t in texts if t)) - len(todo),
+             cache.directory))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
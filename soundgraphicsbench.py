@@ -0,0 +1,232 @@
+# Benchmarks of the sonification hot paths in sound_graphics.py
+#
+# Runs headless (see soundgraphicsheadless.py), so it works on a server
+# with neither a display nor a sound card.  Results are written as JSON, and
+# a previous run can be given with --compare to show what got faster or
+# slower.  It exits with status 1 if importing sound_graphics took longer
+# than sound_graphics.IMPORT_BUDGET.
+#
+# Usage:  python soundgraphicsbench.py [-o results.json] [--compare old.json]
+
+import soundgraphicsheadless
+STUB_TK = soundgraphicsheadless.setup()
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import numpy as np
+import pygame
+import sound_graphics as sg
+import sound_speech
+from typing import Callable, Dict, List, Optional
+
+# Results are in microseconds per call unless the name says otherwise
+Result = Dict[str, float]
+
+def measure(func:Callable[[], object], number:int, repeat:int = 5) -> Result:
+    """Times NUMBER calls of FUNC, REPEAT times over."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number * 1e6)
+    return {'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.mean(times), 'calls': number * repeat}
+
+def regularPolygon(n:int, cx:float, cy:float, r:float) -> sg.Polygon:
+    pts = [sg.g.Point(cx + r * np.cos(2 * np.pi * i / n),
+                      cy + r * np.sin(2 * np.pi * i / n)) for i in range(n)]
+    return sg.Polygon(*pts, sound=440)
+
+def shapes(cx:float, cy:float) -> Dict[str, sg.SoundObject]:
+    """One of each kind of shape, centered on (CX, CY)."""
+    p1, p2 = sg.g.Point(cx - 60, cy - 40), sg.g.Point(cx + 60, cy + 40)
+    result = {'Point': sg.Point(cx, cy, sound=440),
+              'Line': sg.Line(p1, p2, sound=440),
+              'Circle': sg.Circle(sg.g.Point(cx, cy), 50, sound=440),
+              'Rectangle': sg.Rectangle(p1, p2, sound=440),
+              'Oval': sg.Oval(p1, p2, sound=440),
+              'Text': sg.Text(sg.g.Point(cx, cy), 'Benchmark', sound=440)}
+    for n in (3, 8, 32, 128, 512):
+        result['Polygon-%d' % n] = regularPolygon(n, cx, cy, 80)
+    return result
+
+def randomScene(win:sg.GraphWin, count:int, rng:random.Random) -> None:
+    """Draws COUNT random shapes in WIN."""
+    w, h = win.getWidth(), win.getHeight()
+    for i in range(count):
+        x, y = rng.uniform(0, w), rng.uniform(0, h)
+        size = rng.uniform(5, 40)
+        kind = i % 4
+        if kind == 0:
+            item:sg.SoundObject = sg.Circle(sg.g.Point(x, y), size, sound=440)
+        elif kind == 1:
+            item = sg.Rectangle(sg.g.Point(x, y), sg.g.Point(x + size, y + size),
+                                sound=440)
+        elif kind == 2:
+            item = sg.Oval(sg.g.Point(x, y), sg.g.Point(x + 2 * size, y + size),
+                           sound=440)
+        else:
+            item = regularPolygon(rng.randint(3, 12), x, y, size)
+        item.draw(win)
+
+def benchImport() -> Dict[str, Result]:
+    """Time to import sound_graphics, in a fresh interpreter."""
+    code = ('import soundgraphicsheadless; soundgraphicsheadless.setup(%r); '
+            'import sound_graphics; print(sound_graphics.IMPORT_SECONDS)' % STUB_TK)
+    times = []
+    for _ in range(3):
+        out = subprocess.run([sys.executable, '-c', code], check=True,
+                             capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(float(out.stdout.split()[-1]) * 1e6)
+    return {'import': {'min': min(times), 'median': statistics.median(times),
+                       'mean': statistics.mean(times), 'calls': len(times),
+                       'budget': sg.IMPORT_BUDGET * 1e6}}
+
+def benchStartup(repeat:int) -> Dict[str, Result]:
+    """Creating and closing a GraphWin, after the first."""
+    sg.GraphWin('warm-up').close()
+    return {'GraphWin': measure(lambda: sg.GraphWin('bench').close(), repeat, 3)}
+
+def benchContains(number:int) -> Dict[str, Result]:
+    """containsPt for each kind of shape, at random points around it."""
+    win = sg.GraphWin('containsPt', 400, 400, autoflush=False)
+    rng = np.random.default_rng(1)
+    pts = [(float(x), float(y)) for x, y in rng.uniform(80, 320, (number, 2))]
+    results = {}
+    for name, item in shapes(200, 200).items():
+        item.draw(win)
+        def run(item=item) -> None:
+            for x, y in pts:
+                item.containsPt(x, y)
+        r = measure(run, 1)
+        results['containsPt/' + name] = {k: v / len(pts) if k != 'calls' else v * len(pts)
+                                         for k, v in r.items()}
+        item.undraw()
+    win.close()
+    return results
+
+def benchPointer(sizes:List[int], events:int, backend:str = 'grid') -> Dict[str, Result]:
+    """Latency of a motion event, from _onMouseMove to the mixer calls,
+    against the number of shapes in the window, with the hit-test BACKEND.
+    The raster is built before timing starts."""
+    prefix = 'pointer' if backend == 'grid' else 'pointer-' + backend
+    results = {}
+    for size in sizes:
+        win = sg.GraphWin('pointer', 600, 600, autoflush=False, maxMotionRate=None,
+                          hitBackend=backend)
+        randomScene(win, size, random.Random(size))
+        rng = random.Random(0)
+        path = [(rng.randrange(600), rng.randrange(600)) for _ in range(events)]
+        motions = [types.SimpleNamespace(x=x, y=y) for x, y in path]
+        win._hitTest(0, 0)
+        def run() -> None:
+            for e in motions:
+                win._onMouseMove(e)
+        r = measure(run, 1)
+        results['%s/%d' % (prefix, size)] = {k: v / events if k != 'calls' else v * events
+                                        for k, v in r.items()}
+        win.close()
+    return results
+
+def benchTone(number:int) -> Dict[str, Result]:
+    freqs = iter(np.linspace(200, 900, number * 5 + 1).tolist())
+    return {'Tone': measure(lambda: sg.Tone(next(freqs)), number),
+            'ToneBank/miss': measure(lambda: sg.ToneBank().getSound(0), number)}
+
+def benchSpeech(number:int) -> Dict[str, Result]:
+    """Loading a pre-rendered speech clip, without and with the registry."""
+    directory = tempfile.mkdtemp()
+    saved = sg.SoundObject.speechCache
+    try:
+        cache = sound_speech.SpeechCache(directory, sound_speech.BeepBackend())
+        text = 'the quick brown fox jumps over the lazy dog'
+        cache.prerender([text], workers=1)
+        sg.SoundObject.speechCache = cache
+        def cold() -> None:
+            sg.soundRegistry.clear()
+            sg.SoundObject.textToSpeech(text)
+        return {'textToSpeech/cold': measure(cold, number),
+                'textToSpeech/cached': measure(lambda: sg.SoundObject.textToSpeech(text),
+                                               number)}
+    finally:
+        sg.SoundObject.speechCache = saved
+        shutil.rmtree(directory, ignore_errors=True)
+
+def environment() -> Dict[str, object]:
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'pygame': pygame.version.ver,
+            'mixer': pygame.mixer.get_init(),
+            'tkinter': 'stub' if STUB_TK else 'tk'}
+
+def compare(old:Dict[str, Result], new:Dict[str, Result]) -> None:
+    """Prints each benchmark's median now against OLD's."""
+    print('%-24s %12s %12s %8s' % ('benchmark', 'old (us)', 'new (us)', 'ratio'))
+    for name in sorted(new):
+        if name in old:
+            a, b = old[name]['median'], new[name]['median']
+            print('%-24s %12.2f %12.2f %7.2fx' % (name, a, b, b / a if a else float('nan')))
+
+def main(args:List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark sound_graphics.')
+    parser.add_argument('-o', '--output', default='soundgraphicsbench.json',
+                        help='file to write results to')
+    parser.add_argument('--compare', metavar='FILE', default=None,
+                        help='earlier results to compare against')
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer iterations, for a smoke test')
+    options = parser.parse_args(args[1:])
+
+    scale = 10 if options.quick else 1
+    sg.AudioEngine.acquire() # Keeps the mixer open between windows
+    results:Dict[str, Result] = {}
+    benches = [('import', benchImport),
+               ('startup', lambda: benchStartup(20 // scale)),
+               ('containsPt', lambda: benchContains(2000 // scale)),
+               ('pointer', lambda: benchPointer([1, 10, 100, 1000], 2000 // scale))]
+    for backend in sg.GraphWin.HIT_BACKENDS:
+        if backend != 'grid':
+            benches.append(('pointer-' + backend, lambda backend=backend:
+                            benchPointer([10, 100], 500 // scale, backend)))
+    benches += [('tone', lambda: benchTone(200 // scale)),
+                ('speech', lambda: benchSpeech(50 // scale))]
+    for name, bench in benches:
+        start = time.perf_counter()
+        results.update(bench())
+        print('%s: %.1f s' % (name, time.perf_counter() - start), file=sys.stderr)
+
+    with open(options.output, 'w') as f:
+        json.dump({'version': 1, 'environment': environment(), 'results': results},
+                  f, indent=1, sort_keys=True)
+    for name in sorted(results):
+        print('%-24s %12.2f us' % (name, results[name]['median']))
+    if options.compare:
+        with open(options.compare) as f:
+            compare(json.load(f)['results'], results)
+    imported = results['import']
+    if imported['median'] > imported['budget']:
+        print('import took %.0f us, over its budget of %.0f us'
+              % (imported['median'], imported['budget']), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,202 @@
+# Running sound_graphics.py without a display or an audio device
+#
+# Call setup() before sound_graphics (or graphics) is imported.  Audio goes
+# to SDL's dummy driver, which mixes in real time but plays nothing.  If
+# there is no display, a stand-in for tkinter is installed: a canvas that
+# keeps track of its items but draws nothing, with after() timers run by
+# update().  That is enough for windows, drawing, hit-testing and timed
+# callbacks, which is what the benchmark and replay scripts need; it is
+# not a general replacement for Tk.
+
+import os
+import sys
+import time
+import types
+from typing import Callable, Dict, List, Optional, Tuple
+
+def setup(stubTk:Optional[bool] = None) -> bool:
+    """Prepares the process to run sound_graphics headless.  STUBTK says
+    whether to replace tkinter; by default it is replaced when there is
+    no display to connect to.  Returns whether it was replaced."""
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    if stubTk is None:
+        stubTk = (sys.platform.startswith('linux')
+                  and not os.environ.get('DISPLAY')
+                  and not os.environ.get('WAYLAND_DISPLAY'))
+    if stubTk:
+        if getattr(sys.modules.get('tkinter'), 'STUB', False):
+            return True # Already set up
+        if 'graphics' in sys.modules:
+            raise RuntimeError('setup() must be called before graphics is imported')
+        sys.modules['tkinter'] = _stubModule()
+    return stubTk
+
+class TclError(Exception):
+    pass
+
+class Event(object):
+    pass
+
+class _Widget(object):
+    """Stand-in for the tkinter widgets graphics.py creates.  Anything
+    not implemented does nothing."""
+
+    # Pending after() callbacks of every widget: id -> (due time, callback)
+    _timers:Dict[str, Tuple[float, Callable[[], object]]] = {}
+    _nextTimer = 0
+
+    def __init__(self, master:Optional['_Widget'] = None, **options) -> None:
+        self.master = master
+        self._options = dict(options)
+        self._title = ''
+
+    def __getattr__(self, name:str) -> Callable:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+    def title(self, title:Optional[str] = None) -> str:
+        if title is not None:
+            self._title = title
+        return self._title
+
+    def config(self, **options) -> None:
+        self._options.update(options)
+
+    configure = config
+
+    def after(self, ms:int, func:Optional[Callable] = None, *args) -> str:
+        if func is None:
+            time.sleep(ms / 1000)
+            return ''
+        _Widget._nextTimer += 1
+        timer = 'after#%d' % _Widget._nextTimer
+        _Widget._timers[timer] = (time.perf_counter() + ms / 1000,
+                                  lambda: func(*args))
+        return timer
+
+    def after_cancel(self, timer:str) -> None:
+        _Widget._timers.pop(timer, None)
+
+    def update(self) -> None:
+        """Runs the after() callbacks that are due, in order."""
+        now = time.perf_counter()
+        due = sorted((when, timer) for timer, (when, _) in _Widget._timers.items()
+                     if when <= now)
+        for _, timer in due:
+            entry = _Widget._timers.pop(timer, None)
+            if entry is not None:
+                entry[1]()
+
+    update_idletasks = update
+
+    def winfo_width(self) -> int:
+        return int(self._options.get('width', 1))
+
+    def winfo_height(self) -> int:
+        return int(self._options.get('height', 1))
+
+class Tk(_Widget):
+    pass
+
+class Toplevel(_Widget):
+    pass
+
+class Frame(_Widget):
+    pass
+
+class Entry(_Widget):
+    pass
+
+class StringVar(_Widget):
+    def __init__(self, master:Optional[_Widget] = None, value:str = '') -> None:
+        _Widget.__init__(self, master)
+        self._value = value
+
+    def get(self) -> str:
+        return self._value
+
+    def set(self, value:str) -> None:
+        self._value = value
+
+class PhotoImage(_Widget):
+    def __init__(self, master:Optional[_Widget] = None, file:Optional[str] = None,
+                 width:int = 0, height:int = 0, **options) -> None:
+        _Widget.__init__(self, master, **options)
+        self._width = width
+        self._height = height
+
+    def width(self) -> int:
+        return self._width
+
+    def height(self) -> int:
+        return self._height
+
+class Canvas(_Widget):
+    """Keeps the coordinates and bounding box of each item."""
+
+    def __init__(self, master:Optional[_Widget] = None, **options) -> None:
+        _Widget.__init__(self, master, **options)
+        self._items:Dict[int, List[float]] = {}
+        self._lastItem = 0
+
+    def _create(self, coords:List[float]) -> int:
+        self._lastItem += 1
+        self._items[self._lastItem] = list(coords)
+        return self._lastItem
+
+    @staticmethod
+    def _coords(args:tuple) -> List[float]:
+        # Items are created from numbers and a trailing options dictionary
+        return [float(a) for a in args if not isinstance(a, dict)]
+
+    def create_rectangle(self, *args, **options) -> int:
+        return self._create(self._coords(args))
+
+    create_oval = create_rectangle
+    create_line = create_rectangle
+    create_polygon = create_rectangle
+
+    def create_text(self, x:float, y:float, *args, **options) -> int:
+        return self._create([x, y])
+
+    create_image = create_text
+    create_window = create_text
+
+    def coords(self, item:int, *args) -> List[float]:
+        if args:
+            self._items[item] = self._coords(args)
+        return list(self._items.get(item, []))
+
+    def move(self, item:int, dx:float, dy:float) -> None:
+        c = self._items.get(item)
+        if c is not None:
+            self._items[item] = [v + (dx if i % 2 == 0 else dy)
+                                 for i, v in enumerate(c)]
+
+    def delete(self, item:int) -> None:
+        self._items.pop(item, None)
+
+    def bbox(self, item:int) -> Optional[Tuple[int, int, int, int]]:
+        c = self._items.get(item)
+        if not c:
+            return None
+        xs, ys = c[0::2], c[1::2]
+        return (int(min(xs)), int(min(ys)), int(max(xs)) + 1, int(max(ys)) + 1)
+
+    def find_overlapping(self, x1:float, y1:float, x2:float, y2:float) -> Tuple[int, ...]:
+        """Items whose bounding boxes overlap the rectangle, bottom first."""
+        found = []
+        for item in self._items:
+            box = self.bbox(item)
+            if box and box[0] <= x2 and box[2] >= x1 and box[1] <= y2 and box[3] >= y1:
+                found.append(item)
+        return tuple(found)
+
+def _stubModule() -> types.ModuleType:
+    module = types.ModuleType('tkinter')
+    module.__dict__.update(STUB=True, TclError=TclError, Event=Event, Tk=Tk, Toplevel=Toplevel,
+                           Canvas=Canvas, Frame=Frame, Entry=Entry,
+                           StringVar=StringVar, PhotoImage=PhotoImage)
+    return module
@@ -0,0 +1,166 @@
+# Replays pointer traces recorded by sound_graphics.py windows
+#
+# A GraphWin made with trace='FILE' records the pointer's motion, entering
+# and leaving, with snapshots of its scene (see TraceRecorder).  This
+# script rebuilds each trace's scene in a fresh window and feeds the
+# events back through the window's own event handlers, at the speed they
+# were recorded or as fast as possible, and reports how long handling
+# them took as percentiles.  It runs headless (see
+# soundgraphicsheadless.py), and writes its results in the same JSON
+# format as soundgraphicsbench.py, so that a run can be compared with an
+# earlier one, on another version, with --compare.
+#
+# Usage:  python soundgraphicsreplay.py [--fast] [-o results.json]
+#                                       [--compare old.json] TRACE...
+
+import soundgraphicsheadless
+STUB_TK = soundgraphicsheadless.setup()
+
+import argparse
+import json
+import os
+import sys
+import time
+import types
+import numpy as np
+import sound_graphics as sg
+import soundgraphicsbench as bench
+from typing import Dict, List, Optional, Tuple, Union
+
+Result = bench.Result
+
+# Event kinds in traces, and the handler each is fed to
+KINDS = {'m': ('motion', '_onMouseMove'), 'e': ('enter', '_onEnter'),
+         'l': ('leave', '_onLeave')}
+
+def load(filename:str) -> Tuple[Dict[str, object], List[Union[dict, list]]]:
+    """Reads the trace FILENAME.  Returns its header and its records, in
+    order: scene snapshots as dictionaries, events as lists."""
+    with open(filename, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != sg.TraceRecorder.VERSION:
+            raise ValueError('%s: unsupported trace version %r'
+                             % (filename, header.get('version')))
+        records = [json.loads(line) for line in f if line.strip()]
+    return header, records
+
+def percentiles(times:List[float]) -> Result:
+    """Summarizes TIMES, in microseconds."""
+    a = np.asarray(times, dtype=float)
+    return {'min': float(a.min()), 'median': float(np.median(a)),
+            'mean': float(a.mean()), 'p90': float(np.percentile(a, 90)),
+            'p99': float(np.percentile(a, 99)), 'max': float(a.max()),
+            'calls': len(a)}
+
+def waitUntil(due:float) -> None:
+    """Keeps Tk (and its after() timers) running until time DUE."""
+    while True:
+        sg.update()
+        wait = due - time.perf_counter()
+        if wait <= 0:
+            return
+        time.sleep(min(wait, 0.001))
+
+def replay(filename:str, fast:bool = False,
+           options:Optional[Dict[str, object]] = None) -> Dict[str, Result]:
+    """Replays the trace FILENAME, with the window options it was
+    recorded with, updated by OPTIONS.  If FAST, events are fed in as
+    fast as possible, and since the recorded timing then no longer
+    applies, motion isn't coalesced: a threaded window's worker takes
+    each event before the next is fed in.  Returns the time taken by each kind
+    of event's handler, and by the pointer updates they led to."""
+    header, records = load(filename)
+    settings = dict(header['options']) # type: ignore
+    if settings.get('hitBackend') not in sg.GraphWin.HIT_BACKENDS:
+        # 'canvas', since removed, hit-tested exactly as 'grid' does
+        settings['hitBackend'] = 'grid'
+    settings.update(options or {})
+    if fast:
+        settings['maxMotionRate'] = None
+    win = sg.GraphWin(header['title'], header['width'], header['height'], # type: ignore
+                      autoflush=False, instrument=True, **settings) # type: ignore
+    events = [r for r in records if isinstance(r, list)]
+    duration = events[-1][0] if events else 0.0
+    # Keep every pointer update, not just the last few seconds
+    win._latency = sg.LatencyStats(max(10.0, 2 * duration))
+    times:Dict[str, List[float]] = {name: [] for name, _ in KINDS.values()}
+    items:List[sg.SoundObject] = []
+    start = time.perf_counter()
+    for record in records:
+        if isinstance(record, dict):
+            for item in items:
+                item.undraw()
+            if record['coords']:
+                win.setCoords(*record['coords'])
+            items = sg.TraceRecorder.restore(win, record['scene'])
+            continue
+        t, kind, x, y = record
+        name, method = KINDS[kind]
+        if not fast:
+            waitUntil(start + t)
+        handler = getattr(win, method)
+        e = types.SimpleNamespace(x=x, y=y)
+        before = time.perf_counter()
+        handler(e)
+        times[name].append((time.perf_counter() - before) * 1e6)
+        if fast and win._worker is not None:
+            # Otherwise a threaded window drops all but the last position
+            win._worker.drain()
+    if not fast:
+        waitUntil(time.perf_counter() + 2 * sg.GraphWin.TICK_MS / 1000)
+    latency = win._latency
+    win.close() # Also waits for a worker thread to finish
+    prefix = 'replay/' + os.path.splitext(os.path.basename(filename))[0]
+    results = {'%s/%s' % (prefix, name): percentiles(t) for name, t in times.items() if t}
+    # LatencyStats percentiles are bucket edges, which may pass the maximum
+    update = latency.stats()['total'] # type: ignore
+    top = update['max']
+    results[prefix + '/update'] = {'median': min(update['p50'], top),
+                                   'mean': update['mean'],
+                                   'p90': min(update['p90'], top),
+                                   'p99': min(update['p99'], top),
+                                   'max': top, 'calls': update['count']}
+    return results
+
+def main(args:List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Replay pointer traces.')
+    parser.add_argument('traces', nargs='+', metavar='TRACE',
+                        help='trace recorded with GraphWin(trace=...)')
+    parser.add_argument('--fast', action='store_true',
+                        help='replay as fast as possible, not at recorded speed')
+    parser.add_argument('--backend', choices=sg.GraphWin.HIT_BACKENDS, default=None,
+                        help='hit-test backend to use instead of the recorded one')
+    parser.add_argument('-o', '--output', default='soundgraphicsreplay.json',
+                        help='file to write results to')
+    parser.add_argument('--compare', metavar='FILE', default=None,
+                        help='earlier results to compare against')
+    options = parser.parse_args(args[1:])
+
+    overrides:Dict[str, object] = {}
+    if options.backend:
+        overrides['hitBackend'] = options.backend
+    sg.AudioEngine.acquire() # Keeps the mixer open between windows
+    results:Dict[str, Result] = {}
+    for trace in options.traces:
+        start = time.perf_counter()
+        results.update(replay(trace, options.fast, overrides))
+        print('%s: %.1f s' % (trace, time.perf_counter() - start), file=sys.stderr)
+
+    with open(options.output, 'w') as f:
+        json.dump({'version': 1, 'environment': bench.environment(),
+                   'fast': options.fast, 'results': results},
+                  f, indent=1, sort_keys=True)
+    print('%-40s %8s %10s %10s %10s %10s' % ('events', 'count', 'p50 (us)',
+                                             'p90 (us)', 'p99 (us)', 'max (us)'))
+    for name in sorted(results):
+        r = results[name]
+        if 'p99' in r:
+            print('%-40s %8d %10.1f %10.1f %10.1f %10.1f'
+                  % (name, r['calls'], r['median'], r['p90'], r['p99'], r['max']))
+    if options.compare:
+        with open(options.compare) as f:
+            bench.compare(json.load(f)['results'], results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,535 @@
+# Tests of sound_graphics.py and its companion scripts
+#
+# They run headless (see soundgraphicsheadless.py), so they need neither a
+# display nor a sound card.
+#
+# Usage:  python -m pytest test_soundgraphics.py
+
+import soundgraphicsheadless
+soundgraphicsheadless.setup()
+
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+import threading
+import types
+import numpy as np
+import pygame
+import pytest
+import sound_graphics as sg
+import sound_speech
+import soundgraphicsbench as bench
+import soundgraphicsreplay as replay
+from typing import Callable, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+@pytest.fixture
+def mixer() -> None:
+    """Opens the mixer, for tests that make Sounds without a window."""
+    sg.AudioEngine.init()
+
+def testToneBankQuantizes() -> None:
+    """ToneBank keys number the STEP-cent steps up from BASE_FREQ, and
+    each frequency goes to the nearest."""
+    bank = sg.ToneBank(step=10)
+    assert bank.quantize(sg.ToneBank.BASE_FREQ) == 0
+    assert bank.quantize(220 * 2 ** (4 / 1200)) == 0
+    assert bank.quantize(220 * 2 ** (6 / 1200)) == 1
+    assert bank.quantize(440) == 120
+    for freq in (220, 233.1, 261.63, 330, 439.9):
+        cents = 1200 * math.log2(bank.frequency(bank.quantize(freq)) / freq)
+        assert abs(cents) <= 5
+
+def testToneBankEvictsLeastRecentlyUsed(mixer) -> None:
+    """A full ToneBank drops the tone used longest ago."""
+    bank = sg.ToneBank(capacity=3)
+    sounds = [bank.getSound(key) for key in range(3)]
+    assert bank.getSound(0) is sounds[0]
+    bank.getSound(3) # Drops 1
+    assert len(bank) == 3
+    assert bank.getSound(0) is sounds[0]
+    assert bank.getSound(2) is sounds[2]
+    assert bank.getSound(1) is not sounds[1]
+
+def polygonEdges(points:List[Tuple[int, int]]) -> List[Tuple[int, int, int, int]]:
+    """The edges of the polygon with vertices POINTS, as PolygonKernel
+    takes them."""
+    return [points[i - 1] + points[i] for i in range(len(points))]
+
+def roundPolygon(sides:int, radius:float) -> List[Tuple[int, int]]:
+    """The vertices, on whole pixels, of a regular polygon around (150,
+    150), with horizontal top and bottom edges if SIDES is a multiple of 4."""
+    return [(int(round(150 + radius * math.cos((2 * k + 1) * math.pi / sides))),
+             int(round(150 + radius * math.sin((2 * k + 1) * math.pi / sides))))
+            for k in range(sides)]
+
+def testPolygonHorizontalEdges() -> None:
+    """Points level with a polygon's horizontal edges and shared vertices
+    are classified like any others."""
+    INSIDE, NEAR, OUTSIDE = sg.SoundObject.INSIDE, sg.SoundObject.NEAR, sg.SoundObject.OUTSIDE
+    far = 3 * sg.SoundObject.FRINGE
+    square = sg.PolygonKernel(polygonEdges([(100, 100), (200, 100), (200, 200), (100, 200)]))
+    for y in (100, 200):
+        assert square.classify(100 - far, y) == OUTSIDE
+        assert square.classify(200 + far, y) == OUTSIDE
+    assert square.classify(150, 150) == INSIDE
+    assert square.classify(90, 150) == NEAR
+    diamond = sg.PolygonKernel(polygonEdges([(150, 100), (200, 150), (150, 200), (100, 150)]))
+    assert diamond.classify(150, 150) == INSIDE
+    assert diamond.classify(150, 100 - far) == OUTSIDE
+    assert diamond.classify(100 - far, 150) == OUTSIDE
+
+@pytest.mark.parametrize('sides', [8, 40, 100])
+def testPolygonKernelPaths(sides:int) -> None:
+    """The vectorized and banded tests of larger polygons, and
+    classifyMany, agree with the plain test of small ones."""
+    points = roundPolygon(sides, 100)
+    kernel = sg.PolygonKernel(polygonEdges(points))
+    assert (kernel._bands is not None) == (sides > sg.PolygonKernel.BUCKET_THRESHOLD)
+    rows = sorted(set(range(20, 281, 5)) | {y for _, y in points})
+    xs = np.asarray([x + 0.5 for y in rows for x in range(20, 281, 5)])
+    ys = np.asarray([y for y in rows for x in range(20, 281, 5)], dtype=float)
+    expected = [kernel._classifySmall(x, y) for x, y in zip(xs, ys)]
+    assert [kernel.classify(x, y) for x, y in zip(xs, ys)] == expected
+    assert list(kernel.classifyMany(xs, ys)) == expected
+    assert kernel.classify(150, 150) == sg.SoundObject.INSIDE
+
+class TimerWindow(object):
+    """Just enough of a GraphWin for a MotionDispatcher: its after()
+    timers run only when fire() is called."""
+
+    def __init__(self) -> None:
+        self.timers:Dict[str, Callable] = {}
+
+    def after(self, ms:int, callback:Callable) -> str:
+        timer = 'after#%d' % len(self.timers)
+        self.timers[timer] = callback
+        return timer
+
+    def after_cancel(self, timer:str) -> None:
+        del self.timers[timer]
+
+    def isClosed(self) -> bool:
+        return False
+
+    def fire(self) -> None:
+        timers, self.timers = self.timers, {}
+        for callback in timers.values():
+            callback()
+
+def testMotionCoalesced() -> None:
+    """A MotionDispatcher hands on the first position at once, only the
+    latest of those that come too soon after it, and no repeats."""
+    handled = []
+    win = TimerWindow()
+    motion = sg.MotionDispatcher(win, lambda x, y: handled.append((x, y)), rate=1) # type: ignore
+    for i in range(5):
+        motion.post(i, i)
+    assert handled == [(0, 0)]
+    assert len(win.timers) == 1
+    win.fire()
+    assert handled == [(0, 0), (4, 4)]
+    motion.post(4, 4)
+    win.fire()
+    assert handled == [(0, 0), (4, 4)]
+    assert motion.stats() == {'received': 6, 'dispatched': 2, 'coalesced': 3,
+                              'skipped': 1}
+    motion.post(5, 5)
+    motion.reset()
+    assert not win.timers
+    immediate = sg.MotionDispatcher(win, lambda x, y: handled.append((x, y)), rate=None) # type: ignore
+    immediate.post(6, 6)
+    immediate.post(7, 7)
+    assert handled[-2:] == [(6, 6), (7, 7)]
+
+class ChannelRecorder(object):
+    """Wraps a pygame Channel, noting each method called on it in CALLS."""
+
+    def __init__(self, channel:pygame.mixer.Channel, calls:List[Tuple]) -> None:
+        self._channel = channel
+        self._calls = calls
+
+    def __getattr__(self, name:str) -> Callable:
+        method = getattr(self._channel, name)
+        def record(*args, **kwargs):
+            self._calls.append((name,) + args)
+            return method(*args, **kwargs)
+        return record
+
+def testPitchChangeKeepsPan() -> None:
+    """Restarting the mouse voice at a new pitch keeps its panning."""
+    win = sg.GraphWin('pan', 200, 200, maxMotionRate=None)
+    calls:List[Tuple] = []
+    win.mousechannel = ChannelRecorder(win.mousechannel, calls) # type: ignore
+    win._updatePointer(150, 50)
+    pan = [call for call in calls if call[0] == 'set_volume'][-1]
+    del calls[:]
+    win._updatePointer(150, 150) # Only the pitch changes
+    assert calls[0][0] == 'play'
+    assert calls[-1] == pan
+    win.close()
+
+def testRegistryBudget(mixer) -> None:
+    """A SoundRegistry over its byte budget drops the sounds used longest
+    ago, but always keeps the one just made."""
+    size = pygame.sndarray.samples(sg.Tone.silence(0.1)).nbytes
+    registry = sg.SoundRegistry(budget=2 * size)
+    silence = lambda: sg.Tone.silence(0.1)
+    a = registry.get(('a',), silence)
+    b = registry.get(('b',), silence)
+    assert registry.get(('a',), silence) is a
+    registry.get(('c',), silence) # Drops b
+    assert len(registry) == 2 and registry.bytes == 2 * size
+    assert registry.get(('a',), silence) is a
+    assert registry.get(('b',), silence) is not b
+    assert registry.stats()['hits'] == 2 and registry.stats()['misses'] == 4
+    small = sg.SoundRegistry(budget=size // 2)
+    small.get(('a',), silence)
+    assert len(small) == 1
+
+@pytest.mark.parametrize('rate', [22050, 44100, 48000])
+def testLoopLength(rate:int) -> None:
+    """Tone loops hold a whole number of cycles, pitched within TOLERANCE
+    when MAX_CYCLES cycles allow, and otherwise as near as they can be."""
+    Wavetable = sg.Wavetable
+    assert Wavetable.loopLength(rate / 100, rate) == (100, 1)
+    for freq in (55, 220, 261.63, 329.6, 440, 441, 879.9, 3520):
+        length, cycles = Wavetable.loopLength(freq, rate)
+        assert 1 <= cycles <= Wavetable.MAX_CYCLES
+        error = abs(length * freq / (cycles * rate) - 1)
+        best = min(abs(max(round(c * rate / freq), 1) * freq / (c * rate) - 1)
+                   for c in range(1, Wavetable.MAX_CYCLES + 1))
+        assert error <= Wavetable.TOLERANCE or error == pytest.approx(best)
+        loop = np.empty((length, 2), dtype=np.int16)
+        Wavetable.get('sine').fill(loop, cycles)
+        wave = loop[:, 0]
+        assert (loop[:, 1] == wave).all()
+        # The sine starts each cycle at 0, so rises through 0 once per cycle
+        assert np.count_nonzero((np.roll(wave, 1) < 0) & (wave >= 0)) == cycles
+
+def testLatencyPercentiles() -> None:
+    """LatencyHistogram's percentiles land in the right buckets, and its
+    samples expire once they are older than its window."""
+    histogram = sg.LatencyHistogram(window=10, slots=10)
+    for i in range(100):
+        histogram.add(100e-6 if i < 90 else 10e-3, now=5.0)
+    summary = histogram.summary(now=5.0)
+    assert summary['count'] == 100
+    assert summary['mean'] == pytest.approx(1090)
+    assert summary['max'] == pytest.approx(10000)
+    # Percentiles are the upper edges of buckets a quarter octave wide
+    assert 100 <= summary['p50'] <= 125
+    assert 100 <= summary['p90'] <= 125
+    assert 10000 <= summary['p99'] <= 12500
+    assert histogram.summary(now=14.0)['count'] == 100
+    assert histogram.summary(now=16.0)['count'] == 0
+
+def topmostHit(win:sg.GraphWin, x:float, y:float) \
+        -> Tuple[Optional[sg.SoundObject], Optional[sg.SoundObject]]:
+    """The topmost sound item in WIN that (x, y) is INSIDE, or else the
+    topmost one it is NEAR, found by testing every item."""
+    near = None
+    for item in reversed(win.soundItems()):
+        code = item.containsPt(x, y)
+        if code == sg.SoundObject.INSIDE:
+            return item, None
+        elif code == sg.SoundObject.NEAR and near is None:
+            near = item
+    return None, near
+
+def testRasterFollowsChanges() -> None:
+    """Moving or undrawing an item re-rasterizes only where it was and
+    is, and the HitRaster still finds what testing every item finds."""
+    win = sg.GraphWin('raster', 300, 300, hitBackend='raster')
+    P = sg.g.Point
+    circle = sg.Circle(P(60, 60), 30, sound=440)
+    box = sg.Rectangle(P(50, 50), P(150, 120), sound=440)
+    line = sg.Line(P(10, 290), P(290, 200), sound=440)
+    for item in (circle, box, line):
+        item.draw(win)
+    raster = win._raster
+    def check() -> None:
+        for x in range(0, 300, 5):
+            for y in range(0, 300, 5):
+                assert raster.hitTest(x, y)[:2] == topmostHit(win, x, y), (x, y)
+    check()
+    assert raster.rebuilds == 1
+    box.move(40, 30)
+    check()
+    circle.undraw()
+    check()
+    assert raster.rebuilds == 1 and raster.updates == 3
+    win.close()
+
+def testTextFollowsItsText() -> None:
+    """A Text's hit area follows setText and setSize."""
+    win = sg.GraphWin('text', 300, 300)
+    label = sg.Text(sg.g.Point(150, 150), 'Hi', sound=440)
+    label.draw(win)
+    label.setText('Hello there, everyone')
+    wide = label.screenBBox()
+    x = int(wide[2]) - 2
+    assert win._hitTest(x, 150)[0] is label
+    label.setText('Hi')
+    assert win._hitTest(x, 150)[0] is None
+    label.setText('Hello there, everyone')
+    label.setSize(36)
+    tall = label.screenBBox()
+    assert tall[3] - tall[1] > wide[3] - wide[1]
+    assert win._hitTest(x + 20, 150)[0] is label
+    win.close()
+
+def testWindowsShareChannels() -> None:
+    """Windows take their channels from one pool, and a closed window's
+    channels go to the next window opened."""
+    def users() -> Tuple[int, int]:
+        stats = sg.AudioEngine.stats()
+        return stats['users'], stats['inUse']
+    before = users()
+    first = sg.GraphWin('first')
+    second = sg.GraphWin('second')
+    assert not set(first._channels) & set(second._channels)
+    channels = second._channels
+    second.close()
+    third = sg.GraphWin('third')
+    assert third._channels == channels
+    assert users() == (before[0] + 2, before[1] + 2 * len(channels))
+    third.close()
+    first.close()
+    assert users() == before
+
+def testSampleConversions() -> None:
+    """toInt16 scales samples of any type to int16, and toNative puts them
+    in the mixer's format, from which pygame gives them back unchanged."""
+    toInt16 = sg.AudioEngine.toInt16
+    assert list(toInt16(np.array([0, 128, 255], dtype=np.uint8))) == [-32768, 0, 32512]
+    assert list(toInt16(np.array([-1.0, 0.5, 2.0]))) == [-32768, 16384, 32767]
+    assert list(toInt16(np.array([-2**31, 2**16], dtype=np.int32))) == [-32768, 1]
+    mono = np.array([0, 16384, -16384, 32512], dtype=np.int16)
+    sound = pygame.sndarray.make_sound(sg.AudioEngine.toNative(mono))
+    samples = pygame.sndarray.samples(sound).reshape(len(mono), -1)
+    assert samples.shape[1] == sg.AudioEngine.format()[2]
+    assert (toInt16(samples) == mono[:, np.newaxis]).all()
+
+def testTraceRoundTrip(tmp_path) -> None:
+    """soundgraphicsreplay.py rebuilds a recorded trace's scene and feeds
+    back each of its events."""
+    trace = str(tmp_path / 'circle.jsonl')
+    win = sg.GraphWin('traced', 200, 200, trace=trace, maxMotionRate=None)
+    sg.Circle(sg.g.Point(100, 100), 40, sound=440).draw(win)
+    win._onEnter(types.SimpleNamespace(x=0, y=100))
+    for x in range(0, 200, 10):
+        win._onMouseMove(types.SimpleNamespace(x=x, y=100))
+    win._onLeave(types.SimpleNamespace(x=199, y=100))
+    win.close()
+    header, records = replay.load(trace)
+    assert (header['width'], header['height']) == (200, 200)
+    scenes = [record for record in records if isinstance(record, dict)]
+    assert [item['kind'] for item in scenes[-1]['scene']] == ['Circle']
+    events = [record for record in records if isinstance(record, list)]
+    assert [event[1] for event in events] == ['e'] + ['m'] * 20 + ['l']
+    results = replay.replay(trace, fast=True)
+    assert results['replay/circle/enter']['calls'] == 1
+    assert results['replay/circle/motion']['calls'] == 20
+    assert results['replay/circle/leave']['calls'] == 1
+
+def testImportBudget() -> None:
+    """Importing sound_graphics in a fresh interpreter takes no longer
+    than IMPORT_BUDGET."""
+    imported = bench.benchImport()['import']
+    assert imported['median'] <= imported['budget']
+
+def testImportKeepsEnvironment() -> None:
+    """Importing sound_graphics leaves the environment alone, even the
+    variables pygame reads."""
+    code = ('import soundgraphicsheadless; soundgraphicsheadless.setup(%r); '
+            'import os; os.environ.pop("PYGAME_HIDE_SUPPORT_PROMPT", None); '
+            'before = dict(os.environ); '
+            'import sound_graphics; print(dict(os.environ) == before)'
+            % bench.STUB_TK)
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         capture_output=True, text=True, cwd=HERE)
+    assert out.stdout.splitlines()[-1] == 'True'
+
+def testSpeechRoundTrip(tmp_path, monkeypatch) -> None:
+    """Clips rendered by sound_speech.py, with any backend, are found by
+    textToSpeech, which by default expects gTTS."""
+    directory = str(tmp_path)
+    assert sound_speech.main(['sound_speech.py', '-b', 'beep', '-d', directory,
+                              'Blue circle']) == 0
+    monkeypatch.setattr(sg.SoundObject, 'speechCache', sound_speech.SpeechCache(directory))
+    sound = sg.SoundObject.textToSpeech('Blue circle')
+    assert sound.get_length() > 0
+    with pytest.raises(FileNotFoundError):
+        sg.SoundObject.textToSpeech('Red square')
+
+def randomScene(win:sg.GraphWin, seed:int, count:int = 20) -> List[sg.SoundObject]:
+    """Draws COUNT random, unfilled shapes and Texts, many of them wider
+    than twice FRINGE, in WIN.  Returns them, from back to front."""
+    rng = random.Random(seed)
+    P = sg.g.Point
+    items = []
+    for i in range(count):
+        x, y = rng.uniform(0, 300), rng.uniform(0, 300)
+        w, h = rng.uniform(5, 150), rng.uniform(5, 150)
+        kind = i % 6
+        if kind == 0:
+            item:sg.SoundObject = sg.Circle(P(x, y), w / 2, sound=440)
+        elif kind == 1:
+            item = sg.Rectangle(P(x, y), P(x + w, y + h), sound=440)
+        elif kind == 2:
+            item = sg.Oval(P(x, y), P(x + w, y + h), sound=440)
+        elif kind == 3:
+            item = bench.regularPolygon(rng.randint(3, 8), x, y, w / 2)
+        elif kind == 4:
+            item = sg.Line(P(x, y), P(x + w, y + h), sound=440)
+        else:
+            item = sg.Text(P(x, y), 'label %d' % i, sound=440)
+            item.setSize(rng.choice([12, 24, 36]))
+        item.draw(win)
+        items.append(item)
+    return items
+
+@pytest.mark.parametrize('backend', [b for b in sg.GraphWin.HIT_BACKENDS if b != 'linear'])
+def testBackendsAgree(backend:str) -> None:
+    """Every hit-test backend finds what LinearHits finds, at every pixel,
+    both the topmost hits and the hits a VoiceMixer would mix."""
+    points = [(x, y) for x in range(0, 300, 3) for y in range(0, 300, 3)]
+    for seed in range(6):
+        wins = {}
+        scenes = {}
+        for name in ('linear', backend):
+            wins[name] = sg.GraphWin(name, 300, 300, hitBackend=name, itemVoices=3)
+            scenes[name] = randomScene(wins[name], seed)
+        def index(name:str, item:Optional[sg.SoundObject]) -> int:
+            return scenes[name].index(item) if item is not None else -1
+        for x, y in points:
+            # The NEAR item doesn't matter once the point is INSIDE one
+            hits = {name: [index(name, item) for item in win._hitTest(x, y)]
+                    for name, win in wins.items()}
+            for hit in hits.values():
+                if hit[0] != -1:
+                    hit[1] = -1
+            assert hits[backend] == hits['linear'], (seed, x, y)
+            voices = {name: [(index(name, item), code) for item, code, _
+                             in win._voiceHits(x, y)]
+                      for name, win in wins.items()}
+            assert voices[backend] == voices['linear'], (seed, x, y)
+        for win in wins.values():
+            win.close()
+
+@pytest.mark.parametrize('backend', sg.GraphWin.HIT_BACKENDS)
+def testWorkerLeavesTkAlone(backend:str, monkeypatch) -> None:
+    """A threaded window's worker never calls Tk, even to measure Text."""
+    main = threading.current_thread()
+    def onTkThread(method:Callable) -> Callable:
+        def check(*args, **kwargs):
+            assert threading.current_thread() is main, method.__name__
+            return method(*args, **kwargs)
+        return check
+    monkeypatch.setattr(sg.TextMetrics, 'measure', onTkThread(sg.TextMetrics.measure))
+    errors = []
+    monkeypatch.setattr(sg.traceback, 'print_exc', lambda: errors.append(sys.exc_info()))
+    win = sg.GraphWin('threaded', 300, 300, threaded=True, hitBackend=backend,
+                      maxMotionRate=None)
+    items = randomScene(win, 0)
+    win.setCoords(0, 0, 300, 300)
+    for item in items:
+        if isinstance(item, sg.Text):
+            item.setSize(18)
+    for x in range(0, 300, 7):
+        win._onMouseMove(types.SimpleNamespace(x=x, y=x))
+        # Let the worker take each update, rather than drop it as stale
+        win._worker.drain() # type: ignore
+    win.close()
+    assert not errors, errors[0]
+
+@pytest.mark.parametrize('options', [{'hitBackend': 'bogus'}, {'mouseVoice': 'bogus'},
+                                     {'itemVoices': 0}])
+def testBadOptionsLeakNothing(options) -> None:
+    """A window given bad options raises ValueError before taking any
+    channels from the AudioEngine."""
+    before = sg.AudioEngine.stats()
+    with pytest.raises(ValueError):
+        sg.GraphWin('bad', **options)
+    assert sg.AudioEngine.stats() == before
+
+def testBadTraceLeaksNothing(tmp_path, monkeypatch) -> None:
+    """A window whose trace can't be written raises before opening a
+    toplevel or taking any channels from the AudioEngine."""
+    toplevels = []
+    monkeypatch.setattr(sg.g.tk, 'Toplevel', lambda *args, **kwargs: toplevels.append(args))
+    before = sg.AudioEngine.stats()
+    with pytest.raises(FileNotFoundError):
+        sg.GraphWin('bad', trace=str(tmp_path / 'missing' / 't.jsonl'))
+    assert sg.AudioEngine.stats() == before
+    assert toplevels == []
+
+def testToneSampleRate() -> None:
+    """Tone.SAMPLE_RATE still reads, as the mixer's rate."""
+    with pytest.warns(DeprecationWarning):
+        rate = sg.Tone.SAMPLE_RATE
+    assert rate == sg.AudioEngine.format()[0]
+    with pytest.warns(DeprecationWarning):
+        assert sg.Tone(440).SAMPLE_RATE == rate
+
+def riffChunk(name:bytes, body:bytes) -> bytes:
+    """A RIFF chunk NAME holding BODY, padded to an even length."""
+    return name + struct.pack('<I', len(body)) + body + b'\0' * (len(body) & 1)
+
+def wavFile(path, tag:int, channels:int, bits:int, data:bytes,
+            subFormat:Optional[int] = None, before:bytes = b'') -> str:
+    """Writes a WAV file to PATH, in format TAG (or WAVE_FORMAT_EXTENSIBLE
+    with SUBFORMAT), with the chunks BEFORE ahead of DATA.  Returns its name."""
+    block = channels * bits // 8
+    fmt = struct.pack('<HHIIHH', tag, channels, 22050, 22050 * block, block, bits)
+    if subFormat is not None:
+        # cbSize, valid bits, channel mask, then the SubFormat GUID
+        fmt += struct.pack('<HHIH', 22, bits, 0, subFormat) \
+            + bytes.fromhex('000000001000800000aa00389b71')
+    chunks = riffChunk(b'fmt ', fmt) + before + riffChunk(b'data', data)
+    path.write_bytes(b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks)
+    return str(path)
+
+def testMapWav(tmp_path) -> None:
+    """mapWav maps PCM WAVs of any layout, and leaves other formats alone."""
+    samples, rate = sg.mapWav(wavFile(tmp_path / 'mono8.wav', 1, 1, 8,
+                                      bytes([0, 128, 255])))
+    assert rate == 22050
+    assert samples.dtype == np.uint8 and samples.tolist() == [[0], [128], [255]]
+    stereo = np.array([[1, -1], [32767, -32768]], dtype='<i2')
+    samples, _ = sg.mapWav(wavFile(tmp_path / 'list.wav', 1, 2, 16, stereo.tobytes(),
+                                   before=riffChunk(b'LIST', b'INFOodd')))
+    assert (samples == stereo).all()
+    samples, _ = sg.mapWav(wavFile(tmp_path / 'extensible.wav', 0xFFFE, 2, 16,
+                                   stereo.tobytes(), subFormat=1))
+    assert (samples == stereo).all()
+    floats = np.array([[0.5, -0.5]], dtype='<f4').tobytes()
+    assert sg.mapWav(wavFile(tmp_path / 'float.wav', 0xFFFE, 2, 32, floats,
+                             subFormat=3)) is None
+    assert sg.mapWav(wavFile(tmp_path / 'float3.wav', 3, 2, 32, floats)) is None
+
+@pytest.mark.parametrize('channels', [1, 2, 4])
+@pytest.mark.parametrize('options', [{}, {'mouseVoice': 'stream', 'itemVoices': 3}])
+def testRenderAnyChannels(channels:int, options) -> None:
+    """OfflineRenderer renders for a mixer with any number of channels,
+    with sound only where toNative would put it."""
+    sg.AudioEngine.quit()
+    pygame.mixer.pre_init(channels=channels)
+    try:
+        win = sg.GraphWin('render', 200, 200, **options)
+        sg.Circle(sg.g.Point(100, 100), 40, sound=440).draw(win)
+        path = [(0.0, 20.0, 100.0), (0.1, 100.0, 100.0), (0.2, 150.0, 30.0)]
+        renderer = sg.OfflineRenderer(win)
+        samples = renderer.render(path)
+        assert samples.shape == (round(0.7 * renderer.rate), channels)
+        assert samples[:, :2].any()
+        assert not samples[:, 2:].any()
+        win.close()
+    finally:
+        sg.AudioEngine.quit()
+        pygame.mixer.pre_init()